@@ -0,0 +1,71 @@
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+# Browsers/CDN may reuse a copy for a few minutes, then must revalidate
+# with If-None-Match (cheap 304 when the dataset has not changed).
+CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+
+def make_etag(*parts):
+    """Strong ETag built from a dataset digest and any variant parts."""
+    return '"' + "-".join(str(p) for p in parts if p != "") + '"'
+
+
+def http_date(ts):
+    return formatdate(ts, usegmt=True)
+
+
+def _etag_matches(header, etag):
+    # If-None-Match uses weak comparison (RFC 9110 §13.1.2)
+    if header.strip() == "*":
+        return True
+
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == wanted:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag, mtime):
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current version.
+    If-None-Match takes precedence when both are present.
+    """
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return _etag_matches(inm, etag)
+
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            since = parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(mtime) <= int(since)
+
+    return False
+
+
+def cache_headers(etag, mtime):
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(mtime),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def conditional_response(request: Request, body, etag, mtime,
+                         media_type="application/json"):
+    """Return 304 when the client already holds this version, else the body."""
+    headers = cache_headers(etag, mtime)
+
+    if is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type=media_type, headers=headers)
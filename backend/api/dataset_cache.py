@@ -0,0 +1,100 @@
+import os
+import hashlib
+import threading
+
+
+class DatasetCache:
+    """
+    Process-wide cache for one processed dataset file.
+
+    Keeps the parsed DataFrame and the already-serialized JSON body in
+    memory, keyed on the file's (mtime, size) plus the mtime of an optional
+    reload marker. Repeat requests are answered from memory; the loader only
+    runs again when the file changes on disk, the marker is touched by the
+    pipeline, or invalidate() is called in-process.
+
+    Each entry also carries a SHA-256 of the file bytes, so two processes
+    (or two deploys) serving the same dataset agree on its version.
+    """
+
+    def __init__(self, paths, loader, serializer, reload_marker=None,
+                 max_variants=64):
+        self.paths = paths
+        self.loader = loader
+        self.serializer = serializer
+        self.reload_marker = reload_marker
+        self.max_variants = max_variants
+
+        self._lock = threading.Lock()
+        self._entry = None
+
+    # --------------------------------------------------------
+    # Resolve first existing dataset + its version key
+    # --------------------------------------------------------
+    def _stat(self):
+        path = next((p for p in self.paths if os.path.exists(p)), None)
+        if not path:
+            raise FileNotFoundError("No dataset found")
+
+        st = os.stat(path)
+        marker = None
+        if self.reload_marker and os.path.exists(self.reload_marker):
+            marker = os.stat(self.reload_marker).st_mtime_ns
+
+        return path, (path, st.st_mtime_ns, st.st_size, marker), st
+
+    def get(self):
+        """
+        Return the cache entry for the current dataset version:
+        {"path", "key", "mtime", "digest", "frame", "body", "variants"}.
+        """
+        path, key, st = self._stat()
+
+        entry = self._entry
+        if entry is not None and entry["key"] == key:
+            return entry
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            entry = self._entry
+            if entry is not None and entry["key"] == key:
+                return entry
+
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+
+            frame = self.loader(path)
+            entry = {
+                "path": path,
+                "key": key,
+                "mtime": st.st_mtime,
+                "digest": digest,
+                "frame": frame,
+                "body": self.serializer(frame),
+                "variants": {},
+            }
+            self._entry = entry
+            print(f"[INFO] Dataset cache loaded → {path} ({len(frame)} rows)")
+            return entry
+
+    def variant(self, entry, key, build):
+        """
+        Memoize a derived body (filtered/projected view) on a cache entry.
+        Variants die with their entry, so a reload drops them all; the
+        oldest is evicted once max_variants is reached.
+        """
+        variants = entry["variants"]
+        if key in variants:
+            return variants[key]
+
+        value = build(entry["frame"])
+        with self._lock:
+            if len(variants) >= self.max_variants:
+                variants.pop(next(iter(variants)))
+            variants[key] = value
+        return value
+
+    def invalidate(self):
+        """Drop the cached entry so the next get() reloads from disk."""
+        with self._lock:
+            self._entry = None
@@ -1,43 +1,187 @@
 import os
-import pandas as pd
-from fastapi import APIRouter, HTTPException
+import re
+import hashlib
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from api import serializer
+from api.conditional import conditional_response, make_etag
+from api.dataset_cache import DatasetCache
 
 router = APIRouter()
 
-@router.get("/history")
-def get_history():
+# Same directory as pipeline.data_store.PROCESSED_DIR (not imported here:
+# it pulls in pandas at startup)
+BASE = os.getenv(
+    "PROCESSED_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "processed")),
+)
+
+# (path, store dataset); Parquet first, CSV only as a fallback
+DATASETS = [
+    (os.path.join(BASE, "merged_dataset.parquet"), "merged"),
+    (os.path.join(BASE, "merged_dataset.csv"), "merged"),
+    (os.path.join(BASE, "merged_data_clean.parquet"), "merged_clean"),
+    (os.path.join(BASE, "merged_data_clean.csv"), "merged_clean"),
+]
+PATHS = [path for path, _ in DATASETS]
+
+# Touched by the pipeline after it rewrites the merged dataset
+RELOAD_MARKER = os.path.join(BASE, ".history_reload")
+
+MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+MAX_LIMIT = 1000
+
+FORMATS = {
+    "records": "application/json",
+    "columns": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def load_history_frame(path):
+    from pipeline.data_store import read_file
+
+    df = read_file(path, dict(DATASETS)[path])
+
+    # JSON contract: month as "YYYY-MM", date as "YYYY-MM-DD"
+    if "month" in df.columns:
+        df["month"] = df["month"].astype(str)
+    if "date" in df.columns:
+        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+
+    return df
+
+
+def serialize_history(df, next_cursor=None):
+    return serializer.encode_records(df, next_cursor=next_cursor)
+
+
+def serialize_history_columns(df, next_cursor=None):
+    return serializer.encode_columns(df, next_cursor=next_cursor)
+
+
+def serialize_history_arrow(df, next_cursor=None):
     try:
-        base = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "..", "data", "processed")
-        )
+        return serializer.encode_arrow(df, next_cursor=next_cursor)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="format=arrow requires pyarrow")
+
 
-        paths = [
-            os.path.join(base, "merged_dataset.csv"),
-            os.path.join(base, "merged_data_clean.csv"),
-        ]
+SERIALIZERS = {
+    "records": serialize_history,
+    "columns": serialize_history_columns,
+    "arrow": serialize_history_arrow,
+}
 
-        path = next((p for p in paths if os.path.exists(p)), None)
-        if not path:
-            raise FileNotFoundError("No dataset found")
 
-        df = pd.read_csv(path)
+history_cache = DatasetCache(
+    PATHS, load_history_frame, serialize_history, reload_marker=RELOAD_MARKER
+)
 
-        # convert "month" to string
-        if "month" in df.columns:
-            df["month"] = df["month"].astype(str)
 
-        # 🔥 CRITICAL FIX: force pandas to treat all numbers as Python objects
-        df = df.astype(object)
+def reload_history():
+    """Explicit reload hook: forget the cached dataset in this process."""
+    history_cache.invalidate()
 
-        # Replace all nan/inf values
-        df = df.where(pd.notnull(df), None)
-        df = df.replace([float("inf"), float("-inf")], None)
 
-        # Now convert to pure Python objects
-        data = df.to_dict(orient="records")
+# --------------------------------------------------------
+# Query parsing + projection / range / paging
+# --------------------------------------------------------
+def _parse_month(value, name):
+    if value is None:
+        return None
+    value = value.strip()
+    # months are compared as strings, so the month number must be real too
+    if not MONTH_RE.match(value) or not 1 <= int(value[5:]) <= 12:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be YYYY-MM")
+    return value
+
+
+def _parse_columns(value):
+    if not value:
+        return None
+    cols = [c.strip() for c in value.split(",") if c.strip()]
+    # month is always returned: it is the row key and the paging cursor
+    return tuple(["month"] + [c for c in cols if c != "month"])
+
+
+def select_history(df, columns=None, month_from=None, month_to=None,
+                   limit=None, cursor=None):
+    """
+    Project and slice the history frame before serialization.
+    Returns (frame, next_cursor); next_cursor is the last month of the page
+    when more rows remain, else None.
+    """
+    if columns is not None:
+        unknown = [c for c in columns if c not in df.columns]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown columns: {', '.join(unknown)}"
+            )
+
+    import numpy as np
+
+    months = df["month"].to_numpy()
+    mask = np.ones(len(df), dtype=bool)
+    if month_from is not None:
+        mask &= months >= month_from
+    if month_to is not None:
+        mask &= months <= month_to
+    if cursor is not None:
+        mask &= months > cursor
+
+    out = df.loc[mask]
+    if columns is not None:
+        out = out[list(columns)]
+
+    next_cursor = None
+    if limit is not None and len(out) > limit:
+        out = out.iloc[:limit]
+        next_cursor = str(out["month"].iloc[-1])
+
+    return out, next_cursor
+
+
+@router.get("/history")
+def get_history(
+    request: Request,
+    columns: str | None = Query(None, description="Comma-separated columns"),
+    month_from: str | None = Query(None, alias="from", description="First month, YYYY-MM"),
+    month_to: str | None = Query(None, alias="to", description="Last month, YYYY-MM"),
+    limit: int | None = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    format: str = Query("records", pattern="^(records|columns|arrow)$"),
+):
+    cols = _parse_columns(columns)
+    month_from = _parse_month(month_from, "from")
+    month_to = _parse_month(month_to, "to")
+    cursor = _parse_month(cursor, "cursor")
+
+    selection = (cols, month_from, month_to, limit, cursor)
+    variant = (format,) + selection
+    media_type = FORMATS[format]
+
+    try:
+        entry = history_cache.get()
+
+        if variant == ("records", None, None, None, None, None):
+            etag = make_etag(entry["digest"][:32])
+            return conditional_response(request, entry["body"], etag, entry["mtime"])
+
+        def build(df):
+            out, next_cursor = select_history(df, *selection)
+            return SERIALIZERS[format](out, next_cursor)
+
+        body = history_cache.variant(entry, variant, build)
+        tag = hashlib.sha1(repr(variant).encode()).hexdigest()[:12]
+        etag = make_etag(entry["digest"][:32], tag)
+        return conditional_response(
+            request, body, etag, entry["mtime"], media_type=media_type
+        )
 
-        return {"status": "ok", "rows": data}
+    except HTTPException:
+        raise
 
     except Exception as e:
         print("HISTORY ERROR:", e)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
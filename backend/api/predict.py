@@ -0,0 +1,187 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field, model_validator
+
+from api import serializer
+
+# pandas and the pipeline modules (numpy, joblib, the model bundle) are
+# imported on first use: load_predictor runs in the background after
+# startup, so importing this router stays cheap on cold starts.
+
+router = APIRouter()
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(BACKEND, "models"))
+
+# Inputs a what-if scenario may override; everything else is derived
+OVERRIDES = ["brent", "rbob", "usd_idr"]
+MAX_SCENARIOS = 100_000
+# Upper bound on every input: far above any real price or rate, and well
+# inside the float32 range the tree models compare in
+MAX_INPUT = 1e6
+
+_state = {"bundle": None, "month": None, "base": None, "error": None}
+_lock = threading.Lock()
+
+
+# --------------------------------------------------------
+# Warm-up (FastAPI lifespan)
+# --------------------------------------------------------
+def load_predictor():
+    """Load the model bundle and the latest exog row; errors are kept, not raised."""
+    with _lock:
+        try:
+            from pipeline.data_store import read_dataset
+            from pipeline.model_registry import get_bundle
+
+            bundle = get_bundle(MODELS_DIR)
+
+            ex = read_dataset("exog").sort_values("month")
+            last = ex.iloc[-1].to_dict()
+
+            _state["bundle"] = bundle
+            _state["month"] = str(last["month"])
+            _state["base"] = {k: v for k, v in last.items() if k != "month"}
+            _state["error"] = None
+            _predict_cached.cache_clear()
+            print(f"[OK] Predictor ready: bundle {bundle.version}, base month {_state['month']}")
+
+        except Exception as e:
+            _state["error"] = str(e)
+            print(f"[WARN] Predictor unavailable: {e}")
+
+
+def current_bundle():
+    """
+    The bundle to serve. get_bundle() reloads models/bundle.joblib when the
+    monthly retrain replaces it; the predictor (bundle, base exog row,
+    scenario cache) is then reloaded so the new version is served.
+    """
+    bundle = _state["bundle"]
+    if bundle is None:
+        raise HTTPException(
+            status_code=503, detail=f"Models not loaded: {_state['error'] or 'warming up'}"
+        )
+
+    try:
+        from pipeline.model_registry import get_bundle
+
+        latest = get_bundle(MODELS_DIR)
+    except Exception as e:
+        print(f"[WARN] Keeping model bundle {bundle.version}: {e}")
+        return bundle
+
+    if latest is not bundle:
+        load_predictor()
+    return _state["bundle"]
+
+
+# --------------------------------------------------------
+# Scenario → predictions
+# --------------------------------------------------------
+def scenario_frame(base, overrides):
+    import pandas as pd
+    from pipeline.exog_loader import derive_exog_features
+
+    row = dict(base)
+    row.update({k: v for k, v in overrides.items() if v is not None})
+
+    # one row: derive on the dict, then build the frame column-wise
+    derive_exog_features(row)
+    return pd.DataFrame({k: [v] for k, v in row.items()})
+
+
+@lru_cache(maxsize=256)
+def _predict_cached(version, brent, rbob, usd_idr):
+    from pipeline.predict import apply_price_floors, score_predictions
+
+    bundle = _state["bundle"]
+    overrides = {"brent": brent, "rbob": rbob, "usd_idr": usd_idr}
+
+    frame = scenario_frame(_state["base"], overrides)
+    predictions = score_predictions(bundle, bundle.predict(frame))
+    apply_price_floors(predictions)
+
+    return {
+        "status": "ok",
+        "month": _state["month"],
+        "model_version": version,
+        "inputs": {k: float(frame[k].iloc[0]) for k in OVERRIDES},
+        "predictions": predictions,
+    }
+
+
+@router.get("/predict")
+def predict(
+    brent: float | None = Query(None, gt=0, le=MAX_INPUT, description="Brent crude, USD/bbl"),
+    rbob: float | None = Query(None, gt=0, le=MAX_INPUT, description="RBOB gasoline, USD/gal"),
+    usd_idr: float | None = Query(None, gt=0, le=MAX_INPUT, description="USD→IDR rate"),
+):
+    bundle = current_bundle()
+
+    return _predict_cached(bundle.version, brent, rbob, usd_idr)
+
+
+# --------------------------------------------------------
+# Batch scenarios (stress testing)
+# --------------------------------------------------------
+# Same constraint as the /predict query parameters, per scenario value
+PositiveInput = Annotated[float, Field(gt=0, le=MAX_INPUT, allow_inf_nan=False)]
+
+
+class ScenarioBatch(BaseModel):
+    """Columnar scenarios; omitted inputs keep the latest exog value."""
+    brent: list[PositiveInput] | None = None
+    rbob: list[PositiveInput] | None = None
+    usd_idr: list[PositiveInput] | None = None
+
+    @model_validator(mode="after")
+    def same_length(self):
+        lengths = {len(v) for v in (self.brent, self.rbob, self.usd_idr) if v is not None}
+        if len(lengths) > 1:
+            raise ValueError("All scenario columns must have the same length")
+        return self
+
+
+def batch_frame(base, batch):
+    import pandas as pd
+    from pipeline.exog_loader import derive_exog_features
+
+    columns = {k: v for k, v in batch.model_dump().items() if v is not None}
+    if not columns:
+        raise HTTPException(status_code=400, detail=f"Provide at least one of {OVERRIDES}")
+
+    # equal lengths are enforced by ScenarioBatch (422)
+    n = len(next(iter(columns.values())))
+    if n == 0 or n > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Scenario count must be 1..{MAX_SCENARIOS}")
+
+    frame = pd.DataFrame({k: v for k, v in base.items() if k not in columns}, index=range(n))
+    for k, v in columns.items():
+        frame[k] = v
+
+    return derive_exog_features(frame)
+
+
+@router.post("/predict/batch")
+def predict_scenarios(batch: ScenarioBatch):
+    bundle = current_bundle()
+
+    from pipeline.predict import predict_batch
+
+    frame = batch_frame(_state["base"], batch)
+    result = predict_batch(bundle, frame)
+
+    payload = {
+        "status": "ok",
+        "month": _state["month"],
+        "model_version": bundle.version,
+        "rows": len(frame),
+        "inputs": {k: frame[k].to_numpy() for k in OVERRIDES},
+        **result,
+    }
+    return Response(content=serializer.dumps(payload), media_type="application/json")
@@ -0,0 +1,115 @@
+import orjson
+
+# numpy / pandas are imported inside the functions that need them so that
+# importing this module (and the routers that use it) stays cheap at startup.
+
+# NumPy arrays go straight into orjson's writer; non-finite floats
+# (NaN, inf, -inf) are emitted as null there, so frames never need
+# to be boxed into Python objects just to scrub them.
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+# dtypes orjson can write directly from a contiguous buffer
+NATIVE_KINDS = "fiub"
+
+
+def _default(obj):
+    """Fallback for values orjson does not know (pd.NA, NaT, Timestamp…)."""
+    import numpy as np
+    import pandas as pd
+
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+# --------------------------------------------------------
+# Column helpers
+# --------------------------------------------------------
+def column_array(series):
+    """
+    Column → something orjson writes directly: a contiguous NumPy array for
+    numeric dtypes, otherwise a list with missing values as None.
+    """
+    import numpy as np
+    import pandas as pd
+
+    arr = series.to_numpy()
+
+    if arr.dtype.kind in NATIVE_KINDS and arr.dtype.byteorder in "=|":
+        return np.ascontiguousarray(arr)
+
+    out = arr.astype(object)
+    out[pd.isna(arr)] = None
+    return out.tolist()
+
+
+def column_list(series):
+    """Column → list of Python scalars (floats keep NaN; orjson nulls them)."""
+    import pandas as pd
+
+    arr = series.to_numpy()
+
+    if arr.dtype.kind in NATIVE_KINDS:
+        return arr.tolist()
+
+    out = arr.astype(object)
+    out[pd.isna(arr)] = None
+    return out.tolist()
+
+
+# --------------------------------------------------------
+# Frame encoders
+# --------------------------------------------------------
+def encode_records(df, **extra) -> bytes:
+    """{"status": "ok", "rows": [{col: value}, ...], **extra}"""
+    names = [str(c) for c in df.columns]
+    lists = [column_list(df[c]) for c in df.columns]
+    rows = [dict(zip(names, vals)) for vals in zip(*lists)]
+
+    payload = {"status": "ok", "rows": rows}
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    return dumps(payload)
+
+
+def encode_columns(df, **extra) -> bytes:
+    """{"status": "ok", "columns": {col: [values...]}, **extra}"""
+    payload = {
+        "status": "ok",
+        "columns": {str(c): column_array(df[c]) for c in df.columns},
+    }
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    return dumps(payload)
+
+
+def encode_arrow(df, **metadata) -> bytes:
+    """Arrow IPC stream; non-finite floats are written as nulls."""
+    import numpy as np
+    import pyarrow as pa
+
+    arrays = []
+    for col in df.columns:
+        arr = df[col].to_numpy()
+        if arr.dtype.kind == "f":
+            arrays.append(pa.array(arr, mask=~np.isfinite(arr)))
+        else:
+            arrays.append(pa.array(arr, from_pandas=True))
+
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+    metadata = {k: str(v) for k, v in metadata.items() if v is not None}
+    if metadata:
+        table = table.replace_schema_metadata(metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
@@ -1,19 +1,33 @@
 from fastapi import APIRouter, Request
-from supabase import create_client
 from dotenv import load_dotenv
 import hashlib
 import os
 
+from api.visit_batcher import VisitBatcher
+from storage import get_storage
+
 load_dotenv()
 
 router = APIRouter()
 
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+FLUSH_INTERVAL = float(os.getenv("VISIT_FLUSH_INTERVAL", "5"))
+MAX_PENDING = int(os.getenv("VISIT_MAX_PENDING", "10000"))
+
 
 def hash_ip(ip: str) -> str:
     return hashlib.sha256(ip.encode()).hexdigest()
 
 
+def write_visits(batch):
+    # One atomic increment-or-insert for the whole batch
+    get_storage().increment_visits(batch)
+
+
+visit_batcher = VisitBatcher(
+    write_visits, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING
+)
+
+
 @router.post("/track")
 async def track_visit(request: Request):
     ip = request.client.host or "unknown"
@@ -26,35 +40,9 @@ async def track_visit(request: Request):
     except Exception:
         body = {}
 
-    fp = body.get("fp")
-
-    # ----- READ EXISTING VISITOR -----
-    existing = supabase.table("visits") \
-        .select("*") \
-        .eq("ip_hash", ip_h) \
-        .maybe_single() \
-        .execute()
-
-    # Safely extract data (could be None)
-    row = None
-    if existing and hasattr(existing, "data") and existing.data:
-        row = existing.data
-
-    # ----- UPDATE OR INSERT -----
-    if row:
-        # Update returning visitor
-        supabase.table("visits").update({
-            "visits": row["visits"] + 1,
-            "last_seen": "NOW()"
-        }).eq("id", row["id"]).execute()
-
-    else:
-        # Insert new visitor
-        supabase.table("visits").insert({
-            "ip_hash": ip_h,
-            "fp": fp,
-            "user_agent": user_agent,
-            "visits": 1
-        }).execute()
-
-    return {"status": "ok"}
\ No newline at end of file
+    fp = body.get("fp") if isinstance(body, dict) else None
+
+    # Buffered; written by the background flusher
+    visit_batcher.submit(ip_h, fp=fp, user_agent=user_agent)
+
+    return {"status": "ok"}
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+
+class VisitBatcher:
+    """
+    In-process buffer for page-view events.
+
+    track_visit() only records the hit in memory; a background task flushes
+    the buffer every `flush_interval` seconds by handing the aggregated
+    batch to `flush_fn` in a worker thread, so the event loop never waits
+    on the database. Repeat hits from the same ip_hash inside one window
+    collapse into a single row with a count.
+
+    The buffer holds at most `max_pending` distinct visitors; hits from new
+    visitors beyond that are dropped and counted.
+    """
+
+    def __init__(self, flush_fn, flush_interval=5.0, max_pending=10_000):
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = {}
+        self._task = None
+        self._flush_lock = asyncio.Lock()
+
+        self.accepted = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.last_flush = None
+
+    # --------------------------------------------------------
+    # Producer side (called from request handlers)
+    # --------------------------------------------------------
+    def submit(self, ip_hash, fp=None, user_agent=None):
+        """Record one hit. Returns False if the buffer is full and it was dropped."""
+        hit = self._pending.get(ip_hash)
+
+        if hit is None:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            hit = {"ip_hash": ip_hash, "fp": fp, "user_agent": user_agent, "count": 0}
+            self._pending[ip_hash] = hit
+
+        hit["count"] += 1
+        # keep the most recent fingerprint / UA seen in this window
+        if fp is not None:
+            hit["fp"] = fp
+        if user_agent is not None:
+            hit["user_agent"] = user_agent
+
+        self.accepted += 1
+        return True
+
+    # --------------------------------------------------------
+    # Consumer side
+    # --------------------------------------------------------
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = list(self._pending.values()), {}
+            hits = sum(h["count"] for h in batch)
+
+            try:
+                await asyncio.to_thread(self.flush_fn, batch)
+            except Exception as e:
+                # Events are lost rather than retried forever; count them
+                self.failed += hits
+                print(f"[ERROR] Visit flush failed ({len(batch)} visitors, {hits} hits): {e}")
+                return 0
+
+            self.flushed += hits
+            self.last_flush = time.time()
+            return hits
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background loop and flush whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+    def stats(self):
+        return {
+            "pending_visitors": len(self._pending),
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "last_flush": self.last_flush,
+        }
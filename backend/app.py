@@ -1,14 +1,49 @@
-from fastapi import FastAPI
+import asyncio
+import math
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from api.history import router as history_router
-from api.track import router as track_router
+from api.predict import load_predictor, router as predict_router
+from api.track import router as track_router, visit_batcher
+from util_supabase import close_supabase, warm_supabase
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the shared Supabase client in the background so startup
+    # (and Render's health check) does not wait on it
+    warmup = None
+    if os.getenv("STORAGE_BACKEND", "supabase") == "supabase":
+        warmup = asyncio.create_task(asyncio.to_thread(warm_supabase))
+
+    # Load the model bundle once, in the background: /api/predict answers
+    # 503 "warming up" until it is ready instead of delaying startup
+    predictor = asyncio.create_task(asyncio.to_thread(load_predictor))
+
+    # Background flusher for buffered /api/track hits
+    visit_batcher.start()
+    yield
+    # Flush-on-shutdown so buffered visits are not lost on redeploy
+    await visit_batcher.stop()
+
+    await predictor
+    if warmup is not None:
+        await warmup
+    close_supabase()
 
 
 app = FastAPI(
     title="Fuel Predictor API",
     description="API for monthly fuel price predictions",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS for Vercel frontend
@@ -20,10 +55,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    # Same 422 body as FastAPI's default, minus echoed NaN/Infinity inputs
+    # (rejected by /predict/batch), which JSON cannot encode
+    errors = [
+        {k: v for k, v in e.items()
+         if not (k == "input" and isinstance(v, float) and not math.isfinite(v))}
+        for e in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+
 @app.get("/")
 def root():
     return {"message": "Fuel Predictor API is running"}
 
 app.include_router(history_router, prefix="/api")
 
-app.include_router(track_router, prefix="/api")
\ No newline at end of file
+app.include_router(track_router, prefix="/api")
+
+app.include_router(predict_router, prefix="/api")
\ No newline at end of file
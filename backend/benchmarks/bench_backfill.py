@@ -0,0 +1,136 @@
+# benchmarks/bench_backfill.py
+#
+# Bulk backfill (python -m pipeline.update_historical backfill <dir>) vs
+# calling update_historical once per snapshot, on SCALE_MONTHS months of
+# SNAPSHOTS_PER_MONTH synthetic snapshots each (the real snapshot with
+# randomized prices). Checks that backfill with the "first" reducer gives
+# exactly the history the per-snapshot loop builds (it keeps the first
+# snapshot of every month), that "last" / "median" match a plain
+# per-month reduction of the parsed snapshots, and that a re-run adds
+# nothing. Then corrupts some snapshots: first / last must fall back to
+# the month's next parsable snapshot, and a month with none must be
+# reported as missing. Written into a temporary directory.
+#
+# Run from backend/:  python -m benchmarks.bench_backfill
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import data_store as ds
+from pipeline import update_historical as uh
+from pipeline.history_store import MonthStore
+
+TEMPLATE = "data/isibens/isibens_20260126.csv"
+SCALE_MONTHS = 36
+SNAPSHOTS_PER_MONTH = 4
+
+
+def make_snapshots(raw_dir, months, per_month):
+    with open(TEMPLATE, "r", encoding="utf-8") as f:
+        page = f.read()
+
+    rng = np.random.default_rng(0)
+    for month in pd.period_range("2021-01", periods=months, freq="M"):
+        for day in np.sort(rng.choice(np.arange(1, 29), per_month, replace=False)):
+            body = re.sub(r"\d{2}\.\d{3}", lambda m: f"{rng.integers(8, 20)}.{rng.integers(0, 20) * 50:03d}", page)
+            path = os.path.join(raw_dir, f"isibens_{month.strftime('%Y%m')}{day:02d}.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(body)
+
+
+def fresh_store(d, name):
+    base = os.path.join(d, name)
+    os.makedirs(base)
+    return MonthStore(base)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = fn()
+    return time.perf_counter() - t0, out
+
+
+def expected_reduction(raw_dir, how):
+    parsed = [uh._parse_snapshot_safe(p)[1] for p in uh.snapshot_files(raw_dir)]
+    rows = pd.concat([r for r in parsed if not isinstance(r, Exception)], ignore_index=True)
+    out = []
+    for month, group in rows.groupby("month"):
+        group = group.sort_values("date")
+        if how == "median":
+            row = group[ds.TARGET_COLS].median().to_frame().T
+            row["date"] = group["date"].max()
+        else:
+            row = group.iloc[[0 if how == "first" else -1]]
+        out.append(row)
+    return ds.apply_schema("fuel", pd.concat(out, ignore_index=True))
+
+
+def same_history(a, b):
+    cols = ["month", "date"] + ds.TARGET_COLS
+    pd.testing.assert_frame_equal(a[cols].reset_index(drop=True), b[cols].reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    print("\n=========== BACKFILL vs PER-SNAPSHOT UPDATE ===========")
+
+    with tempfile.TemporaryDirectory() as d:
+        raw_dir = os.path.join(d, "raw")
+        os.makedirs(raw_dir)
+        make_snapshots(raw_dir, SCALE_MONTHS, SNAPSHOTS_PER_MONTH)
+        paths = uh.snapshot_files(raw_dir)
+        print(f"[INFO] {len(paths)} snapshots over {SCALE_MONTHS} months, {os.cpu_count()} CPU(s)")
+
+        loop_store = fresh_store(d, "loop")
+        t_loop, _ = timed(lambda: [uh.update_historical(p, loop_store) for p in paths])
+
+        results = {}
+        for workers in sorted({1, os.cpu_count() or 1, 4}):
+            store = fresh_store(d, f"backfill_{workers}")
+            t, added = timed(lambda: uh.backfill(raw_dir, "first", workers, store))
+            assert len(added) == SCALE_MONTHS
+            same_history(store.read(), loop_store.read())
+            results[workers] = t
+
+        print(f"  per-snapshot update_historical  {t_loop * 1e3:9.1f} ms")
+        for workers, t in results.items():
+            print(f"  backfill, {workers} worker(s)         {t * 1e3:9.1f} ms  ({t_loop / t:.1f}×)")
+        print("[OK] backfill (first) == per-snapshot loop")
+
+        for how in ("last", "median"):
+            for workers in sorted({1, os.cpu_count() or 1, 4}):
+                store = fresh_store(d, f"{how}_{workers}")
+                t, _ = timed(lambda: uh.backfill(raw_dir, how, workers, store))
+                print(f"  backfill ({how}), {workers} worker(s) {t * 1e3:9.1f} ms")
+                same_history(store.read(), expected_reduction(raw_dir, how))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert uh.backfill(raw_dir, how, 1, store) == [], "re-run must add nothing"
+        print("[OK] last / median reducers, idempotent re-run")
+
+        # unparsable snapshots: month 1 loses its first, month 2 its last,
+        # month 3 all of them
+        months = {}
+        for p in paths:
+            months.setdefault(uh.snapshot_date(p)[:7], []).append(p)
+        groups = list(months.values())
+        for p in [groups[0][0], groups[1][-1], *groups[2]]:
+            with open(p, "w", encoding="utf-8") as f:
+                f.write("<html>maintenance</html>")
+        lost = uh.snapshot_date(groups[2][0])[:7]
+
+        for how in ("first", "last", "median"):
+            store = fresh_store(d, f"corrupt_{how}")
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                added = uh.backfill(raw_dir, how, 1, store)
+            assert len(added) == SCALE_MONTHS - 1 and lost not in added
+            assert f"No parsable snapshot for 1 month(s): {lost}" in out.getvalue()
+            same_history(store.read(), expected_reduction(raw_dir, how))
+        print(f"[OK] corrupt snapshots: first / last fall back, {lost} reported missing")
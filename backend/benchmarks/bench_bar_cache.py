@@ -0,0 +1,149 @@
+# benchmarks/bench_bar_cache.py
+#
+# Daily bar cache (pipeline/bar_cache.py) against a stub provider with
+# fixed per-call latency: cold fill, warm re-run inside the TTL, stale
+# tail refresh, a revised bar, snapshot pinning, on-disk size vs CSV,
+# snapshot pruning over many revisions and a fetch abandoned on timeout
+# (must not write to the cache). Everything is written into a temporary
+# directory.
+#
+# Run from backend/:  python -m benchmarks.bench_bar_cache
+
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import exog_loader as el
+from pipeline.bar_cache import KEEP_SNAPSHOTS, BarCache, CachedFetcher
+
+LATENCY = 0.3
+END = "2026-01-30"
+
+
+class SeriesStub:
+    """Deterministic business-day closes from START_DATE to END; logs rows served."""
+
+    def __init__(self, latency=LATENCY):
+        self.latency = latency
+        self.rows = 0
+        self.calls = 0
+        self.revisions = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, start):
+        time.sleep(self.latency)
+        days = pd.bdate_range(el.START_DATE, END, name="Date")
+        seed = sum(map(ord, ticker))
+        df = pd.DataFrame({"Close": 50 + 10 * np.sin(np.arange(len(days)) / 20 + seed)}, index=days)
+        for (t, day), value in self.revisions.items():
+            if t == ticker:
+                df.loc[pd.Timestamp(day), "Close"] = value
+
+        df = df.loc[df.index >= pd.Timestamp(start)]
+        with self._lock:
+            self.calls += 1
+            self.rows += len(df)
+        return df
+
+
+def run(fetcher):
+    t0 = time.perf_counter()
+    df = el.fetch_daily(el.START_DATE, fetcher)
+    return df, time.perf_counter() - t0
+
+
+def disk_size(path, suffix):
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path) for f in files if f.endswith(suffix)
+    )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as d:
+        cache = BarCache(os.path.join(d, "bars"))
+        stub = SeriesStub()
+
+        direct, _ = run(SeriesStub(latency=0))
+
+        cold_fetcher = CachedFetcher(stub, cache)
+        cold, t_cold = run(cold_fetcher)
+        pd.testing.assert_frame_equal(direct, cold, check_freq=False)
+        cold_rows, snapshot = stub.rows, cache.snapshot_id()
+
+        warm_fetcher = CachedFetcher(stub, cache)
+        warm, t_warm = run(warm_fetcher)
+        pd.testing.assert_frame_equal(cold, warm)
+        assert stub.rows == cold_rows and warm_fetcher.misses == 0
+
+        # provider revises the last bar; a stale cache fetches only the tail
+        ticker = el.TICKERS["brent"]
+        stub.revisions[(ticker, END)] = 99.0
+        before = stub.rows
+        stale_fetcher = CachedFetcher(stub, cache, ttl_hours=0)
+        stale, t_stale = run(stale_fetcher)
+        tail_rows = stub.rows - before
+        assert stale.loc[END, "brent"] == 99.0
+
+        # the snapshot taken before the revision still reads the old bar
+        pinned = cache.read(ticker, END, snapshot=snapshot)
+        assert pinned["Close"].iloc[-1] == cold.loc[END, "brent"]
+
+        daily = cache.read_daily(el.TICKERS)
+        monthly = daily.resample("ME").agg(["mean", "std"])
+
+        csv_path = os.path.join(d, "daily.csv")
+        daily.to_csv(csv_path)
+        parquet_bytes = disk_size(cache.cache_dir, ".parquet")
+        current_bytes = sum(
+            os.path.getsize(os.path.join(cache.cache_dir, part["file"]))
+            for info in cache.manifest()["tickers"].values()
+            for part in info["years"].values()
+        )
+        csv_bytes = os.path.getsize(csv_path)
+
+        # every full refresh revises an older bar → new partitions each time
+        revisions = 3 * KEEP_SNAPSHOTS
+        fast = SeriesStub(latency=0)
+        fast.revisions = stub.revisions
+        days = pd.bdate_range(el.START_DATE, END)
+        for i in range(revisions):
+            day = days[(i * 97) % len(days)].strftime("%Y-%m-%d")
+            stub.revisions[(ticker, day)] = 100.0 + i
+            cache.update(ticker, fast(ticker, el.START_DATE), el.START_DATE)
+            assert cache.read(ticker, day, day)["Close"].iloc[0] == 100.0 + i
+
+        snapshots = os.listdir(os.path.join(cache.cache_dir, "snapshots"))
+        assert len(snapshots) <= KEEP_SNAPSHOTS * len(el.TICKERS), "snapshots must be pruned"
+        for name in snapshots:
+            cache.read_daily(el.TICKERS, snapshot=name[:-len(".json")])  # kept snapshots stay readable
+        pruned_bytes = disk_size(cache.cache_dir, ".parquet")
+
+        # a call abandoned on timeout finishes later and must not write
+        before = cache.snapshot_id()
+        slow = CachedFetcher(SeriesStub(latency=0.5), cache, ttl_hours=0)
+        try:
+            el.fetch_ticker(slow, ticker, el.START_DATE, timeout=0.1, retries=0)
+            raise AssertionError("expected a timeout")
+        except RuntimeError:
+            pass
+        time.sleep(0.8)
+        assert cache.snapshot_id() == before, "abandoned fetch wrote to the cache"
+
+    print("\n=========== DAILY BAR CACHE ===========")
+    print(f"stub latency            : {LATENCY * 1e3:.0f} ms per call, {len(el.TICKERS)} tickers")
+    print(f"cold fill               : {t_cold * 1e3:7.0f} ms  ({cold_rows} bars fetched)")
+    print(f"warm re-run (in TTL)    : {t_warm * 1e3:7.0f} ms  (0 network calls)")
+    print(f"stale tail refresh      : {t_stale * 1e3:7.0f} ms  ({tail_rows} bars fetched, revision applied)")
+    print(f"pinned snapshot         : {snapshot} still returns the pre-revision bar")
+    print(f"monthly mean/std frame  : {monthly.shape} from cache")
+    # the format is for content addressing / reproducibility, not size
+    print(f"on disk (current)       : {current_bytes / 1e3:.1f} kB parquet vs {csv_bytes / 1e3:.1f} kB csv")
+    print(f"on disk (all snapshots) : {parquet_bytes / 1e3:.1f} kB parquet (revised partitions kept for pinned snapshots)")
+    print(f"{f'after {revisions} revisions':24s}: {len(snapshots)} snapshots kept "
+          f"(≤ {KEEP_SNAPSHOTS} per ticker), {pruned_bytes / 1e3:.1f} kB parquet")
+    print("abandoned on timeout    : late result discarded, cache unchanged")
@@ -0,0 +1,63 @@
+# benchmarks/bench_data_store.py
+#
+# Typed Parquet store (pipeline/data_store.py) vs the old CSV round trip:
+# read (including the type fix-ups readers used to do), write and size on
+# disk, for every processed dataset and for the merged dataset scaled up
+# to SCALE_ROWS rows. Written into a temporary directory.
+#
+# Run from backend/:  python -m benchmarks.bench_data_store
+
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from pipeline import data_store as ds
+
+SCALE_ROWS = 100_000
+REPEATS = 5
+
+
+def best_of(fn, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def compare(name, df, d):
+    csv_path = ds.dataset_path(name, "csv", d)
+    pq_path = ds.dataset_path(name, "parquet", d)
+
+    w_csv = best_of(lambda: df.to_csv(csv_path, index=False))
+    w_pq = best_of(lambda: ds.write_dataset(name, df, d))
+
+    # CSV readers re-inferred types and fixed month/date by hand
+    r_csv = best_of(lambda: ds.read_file(csv_path, name))
+    r_pq = best_of(lambda: ds.read_file(pq_path, name))
+
+    pd.testing.assert_frame_equal(ds.read_file(csv_path, name), ds.read_file(pq_path, name))
+
+    return (w_csv, w_pq, r_csv, r_pq, os.path.getsize(csv_path), os.path.getsize(pq_path))
+
+
+if __name__ == "__main__":
+    rows = []
+    with tempfile.TemporaryDirectory() as d:
+        for name in ds.SCHEMAS:
+            df = ds.read_dataset(name)
+            rows.append((name, len(df), *compare(name, df, d)))
+
+        merged = ds.read_dataset("merged")
+        big = merged.sample(SCALE_ROWS, replace=True, random_state=0).reset_index(drop=True)
+        rows.append(("merged ×scaled", len(big), *compare("merged", big, d)))
+
+    print("\n=========== CSV vs PARQUET (typed store) ===========")
+    print(f"{'dataset':16s} {'rows':>7s} {'write csv':>10s} {'parquet':>9s} "
+          f"{'read csv':>10s} {'parquet':>9s} {'size csv':>10s} {'parquet':>9s}")
+    for name, n, w_csv, w_pq, r_csv, r_pq, s_csv, s_pq in rows:
+        print(f"{name:16s} {n:7d} {w_csv * 1e3:7.1f} ms {w_pq * 1e3:6.1f} ms "
+              f"{r_csv * 1e3:7.1f} ms {r_pq * 1e3:6.1f} ms {s_csv / 1e3:7.1f} kB {s_pq / 1e3:6.1f} kB")
@@ -0,0 +1,81 @@
+# benchmarks/bench_exog_fetch.py
+#
+# Serial vs concurrent exog ticker fetching against a deterministic stub
+# provider (fixed latency per call, no network), plus the retry and
+# timeout paths.
+#
+# Run from backend/:  python -m benchmarks.bench_exog_fetch
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import exog_loader as el
+
+LATENCY = 0.4
+TICKERS = {f"x{i}": f"STUB{i}" for i in range(6)}
+TICKERS.update(el.DEFAULT_TICKERS)
+
+
+class StubFetcher:
+    """
+    Sleeps `latency` per call and returns a deterministic daily frame.
+    fail_first={ticker: n} makes the first n calls for that ticker raise;
+    hang={ticker} makes every call for that ticker sleep past any timeout.
+    """
+
+    def __init__(self, latency=LATENCY, fail_first=None, hang=()):
+        self.latency = latency
+        self.fail_first = dict(fail_first or {})
+        self.hang = set(hang)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, start):
+        with self._lock:
+            self.calls.append(ticker)
+            failing = self.fail_first.get(ticker, 0) > 0
+            if failing:
+                self.fail_first[ticker] -= 1
+
+        time.sleep(60 if ticker in self.hang else self.latency)
+        if failing:
+            raise ConnectionError("stub: connection reset")
+
+        days = pd.bdate_range(start, periods=60)
+        seed = sum(map(ord, ticker))
+        return pd.DataFrame({"Close": 50 + np.sin(np.arange(60) + seed)}, index=days)
+
+
+def timed(**kwargs):
+    t0 = time.perf_counter()
+    df = el.fetch_daily("2025-01-01", tickers=TICKERS, **kwargs)
+    return df, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    serial, t_serial = timed(fetcher=StubFetcher(), workers=1)
+    concurrent, t_conc = timed(fetcher=StubFetcher())
+    pd.testing.assert_frame_equal(serial, concurrent)
+
+    flaky = StubFetcher(fail_first={"BZ=F": 2})
+    retried, t_retry = timed(fetcher=flaky, backoff=0.1)
+    pd.testing.assert_frame_equal(serial, retried)
+
+    t0 = time.perf_counter()
+    try:
+        el.fetch_daily("2025-01-01", StubFetcher(hang={"RB=F"}), tickers=TICKERS,
+                       timeout=0.5, retries=1, backoff=0.1)
+        raise AssertionError("hung ticker did not time out")
+    except RuntimeError as e:
+        timeout_msg, t_timeout = str(e), time.perf_counter() - t0
+
+    print("\n=========== EXOG FETCH: SERIAL vs CONCURRENT ===========")
+    print(f"tickers / stub latency  : {len(TICKERS)} / {LATENCY * 1e3:.0f} ms per call")
+    print(f"serial (1 worker)       : {t_serial * 1e3:7.0f} ms")
+    print(f"concurrent              : {t_conc * 1e3:7.0f} ms  ({t_serial / t_conc:.1f}x)")
+    print(f"2 failures on BZ=F      : {t_retry * 1e3:7.0f} ms  ({flaky.calls.count('BZ=F')} calls, same frame)")
+    print(f"hung RB=F, timeout 0.5s : {t_timeout * 1e3:7.0f} ms  → {timeout_msg}")
+    print("[OK] concurrent frame identical to serial")
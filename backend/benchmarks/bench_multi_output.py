@@ -0,0 +1,67 @@
+# benchmarks/bench_multi_output.py
+#
+# Per-target training loop vs multi-output mode on the merged dataset:
+# wall-clock fit time, artifact size on disk and per-target CV MAE.
+# Then switches the per-target directory to multi-output mode and checks
+# that no stale per-target model.pkl is left next to the shared-model
+# meta.json. All runs write into throw-away model directories.
+#
+# Run from backend/:  python -m benchmarks.bench_multi_output
+
+import os
+import tempfile
+import time
+
+
+from pipeline import train_models as tm
+from pipeline.data_store import read_dataset
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            if f.endswith(".pkl"):
+                total += os.path.getsize(os.path.join(root, f))
+    return total
+
+
+def run(mode, df, model_dir):
+    tm.MODEL_DIR = model_dir
+    t0 = time.perf_counter()
+    if mode == "per_target":
+        results = {}
+        for col in tm.TARGET_COLS:
+            _, name, mae = tm.train_single_target(df, col)
+            results[col] = {"model": name, "mae": mae}
+    else:
+        results = tm.train_multi_output(df)
+    return results, time.perf_counter() - t0, dir_size(model_dir)
+
+
+if __name__ == "__main__":
+    df = read_dataset("merged")
+
+    with tempfile.TemporaryDirectory() as d:
+        single, t_single, b_single = run("per_target", df, os.path.join(d, "single"))
+        multi, t_multi, b_multi = run("multi_output", df, os.path.join(d, "multi"))
+
+        # per_target → multi_output in the same directory
+        switched, _, _ = run("multi_output", df, os.path.join(d, "single"))
+        for col, r in switched.items():
+            if r["model"] is not None:
+                stale = os.path.join(d, "single", col, "model.pkl")
+                assert not os.path.exists(stale), f"stale per-target model left for {col}"
+
+    groups = tm.target_groups(df)
+
+    print("\n=========== PER-TARGET vs MULTI-OUTPUT ===========")
+    print(f"target groups (shared models per family): {len(groups)} for {len(tm.TARGET_COLS)} targets")
+    print(f"fit wall-clock : {t_single:8.1f} s  vs {t_multi:8.1f} s  ({t_single / t_multi:.1f}x)")
+    print(f"artifact size  : {b_single / 1e6:8.1f} MB vs {b_multi / 1e6:8.1f} MB")
+    print("\ntarget          per-target MAE (model)      multi-output MAE (model)")
+    for col in tm.TARGET_COLS:
+        a, b = single[col], multi[col]
+        fmt = lambda r: f"{r['mae']:10.2f} ({r['model']})" if r["mae"] is not None else "       n/a"
+        print(f"{col:15s} {fmt(a):26s}  {fmt(b)}")
+    print("\n[OK] switching to multi-output removes the per-target models it replaces")
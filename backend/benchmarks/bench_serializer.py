@@ -0,0 +1,70 @@
+# benchmarks/bench_serializer.py
+#
+# Per-request cost of serializing the history frame:
+# legacy astype(object) scrub + json.dumps vs api.serializer (orjson).
+#
+# Run from backend/:  python -m benchmarks.bench_serializer
+
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from api import serializer
+from api.history import PATHS, load_history_frame
+
+
+def legacy_records(df):
+    """The pre-serializer path from api/history.py, kept for comparison."""
+    df = df.astype(object)
+    df = df.where(pd.notnull(df), None)
+    df = df.replace([float("inf"), float("-inf")], None)
+    data = df.to_dict(orient="records")
+    return json.dumps(
+        {"status": "ok", "rows": data},
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def synthetic_frame(rows, cols=22, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(10000, 2000, size=(rows, cols))
+    data[rng.random(size=data.shape) < 0.1] = np.nan
+    data[0, 0] = np.inf
+    df = pd.DataFrame(data, columns=[f"c{i}" for i in range(cols)])
+    df.insert(0, "month", [f"{2000 + i // 12}-{i % 12 + 1:02d}" for i in range(rows)])
+    return df
+
+
+def timeit(fn, df, repeat):
+    fn(df)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(df)
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def run(label, df, repeat):
+    old = legacy_records(df)
+    new = serializer.encode_records(df)
+    assert json.loads(old) == json.loads(new), "records output differs"
+
+    t_old = timeit(legacy_records, df, repeat)
+    t_rec = timeit(serializer.encode_records, df, repeat)
+    t_col = timeit(serializer.encode_columns, df, repeat)
+
+    print(f"\n[{label}] rows={len(df)} cols={df.shape[1]}")
+    print(f"  legacy astype(object) + json : {t_old:8.3f} ms  {len(old):>9} B")
+    print(f"  orjson records               : {t_rec:8.3f} ms  {len(new):>9} B  ({t_old / t_rec:.1f}x)")
+    print(f"  orjson columns               : {t_col:8.3f} ms  "
+          f"{len(serializer.encode_columns(df)):>9} B  ({t_old / t_col:.1f}x)")
+
+
+if __name__ == "__main__":
+    path = next(p for p in PATHS if os.path.exists(p))
+    run(os.path.basename(path), load_history_frame(path), repeat=200)
+    run("synthetic", synthetic_frame(10_000), repeat=10)
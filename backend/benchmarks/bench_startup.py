@@ -0,0 +1,89 @@
+# benchmarks/bench_startup.py
+#
+# Cold-start import cost of the API and the pipeline entry points, measured
+# with `python -X importtime` in a fresh interpreter. Fails (exit 1) when a
+# module goes over its time budget or pulls in a heavy dependency that is
+# supposed to load lazily on first use.
+#
+# Run from backend/:  python -m benchmarks.bench_startup
+# Budgets scale with STARTUP_BUDGET_SCALE (e.g. 2.0 on a slow CI box).
+
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUNS = 3
+TOP = 8
+SCALE = float(os.getenv("STARTUP_BUDGET_SCALE", "1.0"))
+
+HEAVY = ["pandas", "numpy", "sklearn", "xgboost", "yfinance", "bs4", "joblib", "pyarrow"]
+
+# module → (budget in ms, heavy packages it must not import)
+BUDGETS = {
+    "app": (600, HEAVY),
+    "pipeline.supabase_writer": (150, HEAVY),
+    "pipeline.exog_loader": (600, ["yfinance", "sklearn", "xgboost", "bs4"]),
+    "pipeline.train_models": (700, ["sklearn", "xgboost", "yfinance", "bs4"]),
+    "run_monthly_pipeline": (900, ["sklearn", "xgboost", "yfinance", "bs4"]),
+}
+
+
+def import_profile(module):
+    """[(name, depth, self_us, cumulative_us)] from one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line.split(":", 1)[1].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cum_us)))
+    return rows
+
+
+def measure(module):
+    best = None
+    for _ in range(RUNS):
+        rows = import_profile(module)
+        total = sum(cum for _, depth, _, cum in rows if depth == 0) / 1e3
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+if __name__ == "__main__":
+    failed = []
+
+    print("\n=========== STARTUP IMPORT TIME ===========")
+    for module, (budget, forbidden) in BUDGETS.items():
+        budget *= SCALE
+        total, rows = measure(module)
+
+        loaded = {name.split(".")[0] for name, *_ in rows}
+        leaked = [m for m in forbidden if m in loaded]
+
+        ok = total <= budget and not leaked
+        print(f"\n{module:28s} {total:7.0f} ms  (budget {budget:.0f} ms)  {'OK' if ok else 'FAIL'}")
+        if leaked:
+            print(f"  eagerly imports: {', '.join(leaked)}")
+
+        top = sorted((r for r in rows if r[1] <= 1), key=lambda r: -r[3])[:TOP]
+        for name, _, _, cum in top:
+            print(f"  {cum / 1e3:7.1f} ms  {name}")
+
+        if not ok:
+            failed.append(module)
+
+    if failed:
+        print(f"\n[ERROR] Over startup budget: {', '.join(failed)}")
+        sys.exit(1)
+
+    print("\n[OK] All entry points within startup budget")
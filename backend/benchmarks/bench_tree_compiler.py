@@ -0,0 +1,76 @@
+# benchmarks/bench_tree_compiler.py
+#
+# Native sklearn/xgboost predict vs the compiled NumPy engine
+# (pipeline/tree_compiler.py) for every model in the bundle: parity on the
+# exog history (plus perturbed and NaN rows) and single-row / batch latency.
+#
+# Run from backend/:  python -m benchmarks.bench_tree_compiler [models_dir]
+
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from pipeline.data_store import read_dataset
+from pipeline.exog_loader import derive_exog_features
+from pipeline.model_registry import MODELS_DIR, get_bundle
+from pipeline.tree_compiler import check_parity, compile_model
+
+BATCH_ROWS = 5000
+REPEATS = 20
+
+
+def best_of(fn, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def inputs(features, ex, rng):
+    base = ex.reindex(columns=features).ffill().bfill().fillna(0).to_numpy(dtype=np.float64)
+    batch = base[rng.integers(0, len(base), BATCH_ROWS)]
+    batch *= rng.normal(1.0, 0.05, batch.shape)
+
+    with_nan = batch[:200].copy()
+    with_nan[rng.random(with_nan.shape) < 0.1] = np.nan
+    return base, batch, with_nan
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore", UserWarning)
+    models_dir = sys.argv[1] if len(sys.argv) > 1 else MODELS_DIR
+
+    bundle = get_bundle(models_dir)
+    ex = derive_exog_features(read_dataset("exog").sort_values("month").reset_index(drop=True))
+    rng = np.random.default_rng(0)
+
+    print("\n=========== NATIVE vs COMPILED TREES ===========")
+    print(f"{'model':18s} {'type':22s} {'parity':>9s} "
+          f"{'1 row native':>13s} {'compiled':>9s} {f'{BATCH_ROWS} rows native':>17s} {'compiled':>9s}")
+
+    for key, model in bundle.models.items():
+        target = next(t for t, m in bundle.targets.items() if m["model_key"] == key)
+        base, batch, with_nan = inputs(bundle.meta(target)["features"], ex, rng)
+        compiled = bundle.compiled.get(key) or compile_model(model)
+
+        err = max(check_parity(model, compiled, X) for X in (base, batch, with_nan))
+
+        one = batch[:1]
+        t1n = best_of(lambda: model.predict(one))
+        t1c = best_of(lambda: compiled.predict(one))
+        tbn = best_of(lambda: model.predict(batch), 5)
+        tbc = best_of(lambda: compiled.predict(batch), 5)
+
+        print(f"{key:18s} {type(model).__name__:22s} {err:9.1e} "
+              f"{t1n * 1e3:10.2f} ms {t1c * 1e3:6.2f} ms {tbn * 1e3:14.1f} ms {tbc * 1e3:6.1f} ms")
+
+    frame = ex.tail(1)
+    bundle.use_compiled = False
+    t_native = best_of(lambda: bundle.predict(frame))
+    bundle.use_compiled = True
+    t_compiled = best_of(lambda: bundle.predict(frame))
+    print(f"\nfull bundle, one scenario: {t_native * 1e3:.1f} ms native vs {t_compiled * 1e3:.1f} ms compiled")
@@ -0,0 +1,140 @@
+# benchmarks/check_incremental_merge.py
+#
+# Incremental merge_monthly_dataset vs a full rebuild, on the real sources
+# and on synthetic sources with SCALE_MONTHS months: a no-op re-run, a
+# fuel month appended (as a MonthStore segment) before and after its exog
+# row arrives, an exog revision inside the re-merge window, and the cases
+# that must fall back to a full rebuild (exog revised before the window,
+# an appended month edited, fuel base rewritten, merged file edited
+# outside the pipeline). Every result is compared with a from-scratch
+# merge of the same sources. Written into a temporary directory.
+#
+# Run from backend/:  python -m benchmarks.check_incremental_merge
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import data_store as ds
+from pipeline import merge_dataset as md
+from pipeline.history_store import MonthStore
+
+SCALE_MONTHS = 2400
+
+
+def synthetic_sources(n):
+    rng = np.random.default_rng(0)
+    months = pd.period_range("1850-01", periods=n, freq="M")
+    fuel = pd.DataFrame({"month": months})
+    for col in ds.TARGET_COLS:
+        fuel[col] = rng.integers(5000, 20000, n).astype("float32")
+    exog = pd.DataFrame({"month": months})
+    for col in ds.EXOG_COLS:
+        exog[col] = rng.normal(50, 10, n)
+    return ds.apply_schema("fuel", fuel), ds.apply_schema("exog", exog)
+
+
+def merge(full=False):
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        md.merge_monthly_dataset(full=full)
+    log = out.getvalue()
+    if "up to date" in log:
+        kind = "no-op"
+    elif "Incremental merge" in log:
+        kind = "incremental"
+    else:
+        kind = "full"
+    return time.perf_counter() - t0, kind, log
+
+
+def check(fuel, exog):
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = ds.apply_schema("merged", md.merge_frames(fuel, exog))
+    pd.testing.assert_frame_equal(ds.read_dataset("merged"), expected)
+
+
+def scenario(label, fuel, exog):
+    steps = []
+    marker = md.reload_marker_path()
+
+    def run(step, expect, full=False):
+        before = os.stat(marker).st_mtime_ns if os.path.exists(marker) else None
+        t, kind, log = merge(full)
+        assert kind == expect, f"{step}: expected {expect}, got {kind}\n{log}"
+        touched = os.path.exists(marker) and os.stat(marker).st_mtime_ns != before
+        assert touched == (kind != "no-op"), f"{step}: reload marker must be touched only on a write"
+        reason = next((l.split("(", 1)[1].rstrip(")…") for l in log.splitlines() if "Full merge" in l), "")
+        steps.append((step, t, kind, reason))
+
+    ds.write_dataset("fuel", fuel.iloc[:-1])
+    ds.write_dataset("exog", exog.iloc[:-1])
+    run("initial (n-1 months)", "full")
+    check(fuel.iloc[:-1], exog.iloc[:-1])
+    run("no-op re-run", "no-op")
+
+    # fuel month n arrives before its exog row, then exog catches up
+    with contextlib.redirect_stdout(io.StringIO()):
+        MonthStore().append(str(fuel["month"].iloc[-1]), fuel.iloc[[-1]])
+    run("append fuel month n", "incremental")
+    check(fuel, exog.iloc[:-1])
+    ds.write_dataset("exog", exog)
+    run("append exog month n", "incremental")
+    check(fuel, exog)
+    run("no-op re-run", "no-op")
+
+    revised = exog.copy()
+    revised.loc[revised.index[-2], "brent"] += 1.0  # inside the window
+    ds.write_dataset("exog", revised)
+    run("revise exog month n-1", "incremental")
+    check(fuel, revised)
+
+    old = revised.copy()
+    old.loc[old.index[2], "brent"] += 1.0
+    ds.write_dataset("exog", old)
+    run("revise exog month 3", "full")
+    check(fuel, old)
+
+    store = MonthStore()
+    segment = os.path.join(store.dir, store.segments()[str(fuel["month"].iloc[-1])])
+    edited = fuel.iloc[[-1]].copy()
+    edited[ds.TARGET_COLS[0]] += 100
+    edited.to_parquet(segment, index=False)
+    run("appended month edited", "full")
+    fuel = pd.concat([fuel.iloc[:-1], edited], ignore_index=True)
+    check(fuel, old)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        MonthStore().compact()
+    run("fuel base compacted", "full")
+    check(fuel, old)
+
+    ds.write_dataset("merged", ds.read_dataset("merged").iloc[:-1])
+    run("merged edited outside", "full")
+    check(fuel, old)
+
+    t_full, _, _ = merge(full=True)
+    steps.append(("--full", t_full, "full", "requested"))
+
+    print(f"\n[{label}] {len(fuel)} months")
+    for step, t, kind, reason in steps:
+        print(f"  {step:24s} {t * 1e3:8.1f} ms  {kind:12s} {reason}")
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(io.StringIO()):
+        real_fuel, real_exog = ds.read_dataset("fuel"), ds.read_dataset("exog")
+
+    print("\n=========== INCREMENTAL MERGE vs FULL REBUILD ===========")
+    for label, sources in [("real sources", (real_fuel, real_exog)),
+                           ("synthetic", synthetic_sources(SCALE_MONTHS))]:
+        with tempfile.TemporaryDirectory() as d:
+            ds.PROCESSED_DIR = d
+            scenario(label, *sources)
+
+    print("\n[OK] every incremental / full result equals a from-scratch merge")
@@ -0,0 +1,157 @@
+# benchmarks/check_isibens_fetch.py
+#
+# fetch_isibens_snapshot against a local HTTP stub serving the real
+# snapshot: first download, 304 on an unchanged page, hash dedup when the
+# server ignores validators, a changed page, a same-day refetch of an
+# older payload, and the run_monthly_pipeline stages (replaced by
+# recorders) once a payload has been processed: only training is
+# skipped. Written into a temporary directory.
+#
+# Run from backend/:  python -m benchmarks.check_isibens_fetch
+
+import contextlib
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pipeline import fetch_isibens as fi
+
+TEMPLATE = "data/isibens/isibens_20260126.csv"
+
+
+class StubServer:
+    """Serves `body` with ETag / Last-Modified; `conditional=False` ignores validators."""
+
+    def __init__(self, body):
+        self.body = body
+        self.conditional = True
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                etag = '"%s"' % hashlib.md5(stub.body).hexdigest()
+                sent = self.headers.get("If-None-Match")
+                if stub.conditional and sent == etag:
+                    stub.requests.append((304, 0))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                stub.requests.append((200, len(stub.body)))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(stub.body)))
+                if stub.conditional:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", formatdate(usegmt=True))
+                self.end_headers()
+                self.wfile.write(stub.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/harga-bbm.csv"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def fetch(stub, base_dir, day):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fi.fetch_isibens_snapshot(stub.url, base_dir, datetime(2026, 2, day))
+
+
+def check_fetch(stub, d):
+    first = fetch(stub, d, 1)
+    assert (first["status"], first["changed"], first["processed"]) == ("new", True, False)
+    with open(first["path"], "rb") as f:
+        assert f.read() == stub.body
+
+    again = fetch(stub, d, 2)
+    assert stub.requests[-1][0] == 304, "validators must be sent"
+    assert (again["status"], again["changed"]) == ("not-modified", False)
+    assert os.path.samefile(again["path"], first["path"]), "unchanged day must be linked"
+
+    stub.conditional = False
+    dup = fetch(stub, d, 3)
+    assert (dup["status"], dup["changed"]) == ("duplicate", False)
+    assert os.path.samefile(dup["path"], first["path"])
+
+    original = stub.body
+    stub.body = stub.body.replace(b"12.350", b"12.500")
+    changed = fetch(stub, d, 4)
+    assert (changed["status"], changed["changed"]) == ("new", True)
+    assert not os.path.samefile(changed["path"], first["path"])
+
+    # same-day refetch returning the older payload: day 4's file keeps its content
+    stub.body = original
+    back = fetch(stub, d, 4)
+    assert (back["status"], back["sha256"]) == ("duplicate", first["sha256"])
+    assert os.path.samefile(back["path"], first["path"]), "path must hold the returned payload"
+    assert fi._file_sha(changed["path"]) == changed["sha256"], "day 4's file must not be relinked"
+
+    stub.conditional = True
+    index = fi.load_index(d)
+    assert len(index["snapshots"]) == 2 and index["latest"] == first["sha256"]
+    assert index["snapshots"][changed["sha256"]]["file"] == os.path.basename(changed["path"])
+    assert index["snapshots"][first["sha256"]]["hits"] == ["20260204"]
+    return first
+
+
+def check_pipeline(stub, d):
+    import run_monthly_pipeline as rmp
+
+    calls = []
+    stages = ["update_historical", "update_exog_history", "merge_monthly_dataset",
+              "train_all_models", "write_prediction"]
+    for name in stages:
+        setattr(rmp, name, lambda *a, name=name, **k: calls.append(name))
+    rmp.predict_next_month = lambda: (calls.append("predict_next_month"),
+                                      ("2026-03", {"pertamina_92": {"price": 1.0, "confidence_pct": 90}}))[1]
+    rmp.fetch_isibens_snapshot = lambda: fi.fetch_isibens_snapshot(stub.url, d, datetime(2026, 2, 5))
+    rmp.mark_processed = lambda sha256: fi.mark_processed(sha256, d)
+
+    all_stages = ["update_historical", "update_exog_history", "merge_monthly_dataset",
+                  "train_all_models", "predict_next_month", "write_prediction"]
+
+    def run(force=False):
+        calls.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = rmp.run_pipeline(force)
+        return ok, list(calls)
+
+    ok, ran = run()
+    assert ok and ran == all_stages, "unprocessed payload runs every stage"
+    ok, ran = run()
+    assert ok and ran == [s for s in all_stages if s != "train_all_models"], \
+        "processed payload still updates history / exog / merge and predicts, only training is skipped"
+    ok, ran = run(force=True)
+    assert ok and ran == all_stages, "--force retrains"
+
+
+if __name__ == "__main__":
+    print("\n=========== ISIBENS FETCH: CONDITIONAL GET + DEDUP ===========")
+    with open(TEMPLATE, "rb") as f:
+        stub = StubServer(f.read())
+
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            check_fetch(stub, d)
+            served = sum(n for _, n in stub.requests)
+            print(f"[OK] 5 fetches: {[s for s, _ in stub.requests]}, {served} body bytes served "
+                  f"(vs {5 * len(stub.body)} unconditional), 2 snapshot files stored")
+
+        with tempfile.TemporaryDirectory() as d:
+            check_pipeline(stub, d)
+            print("[OK] pipeline runs every stage on a new payload, skips only training when processed")
+    finally:
+        stub.close()
@@ -0,0 +1,135 @@
+# benchmarks/check_isibens_parser.py
+#
+# Streaming ISIBENS parser (pipeline/isibens_html_to_csv.py) vs the
+# previous BeautifulSoup + per-cell regex implementation, kept below as
+# the reference. Parity: every data/isibens/*.csv snapshot and synthetic
+# pages must give the same cleaned table (and the same CSV text) for
+# several parser chunk sizes. Timing: synthetic pages with a large first
+# table and SCALE_TABLES trailing tables the streaming parser never reads.
+#
+# Needs beautifulsoup4 for the reference (not a runtime dependency).
+# Run from backend/:  python -m benchmarks.check_isibens_parser
+
+import glob
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline.isibens_html_to_csv import (
+    COLUMNS, PRICE_COLS, parse_isibens_table, read_first_table, table_frame,
+)
+
+SNAPSHOTS = "data/isibens/isibens_*.csv"
+CHUNK_SIZES = [7, 512, 16 * 1024]
+SCALE_ROWS = [10, 1000, 5000]
+SCALE_TABLES = 200
+REPEATS = 3
+
+
+# --------------------------------------------------------
+# Reference: the BeautifulSoup implementation this replaced
+# --------------------------------------------------------
+def legacy_extract_number(cell_text):
+    if not isinstance(cell_text, str):
+        return None
+    text = cell_text.strip()
+    if text == "" or text == "-" or text.lower() == "na":
+        return None
+    m = re.search(r"([0-9]+[.,]?[0-9]*)", text)
+    if not m:
+        return None
+    num = m.group(1).replace(".", "").replace(",", "")
+    return int(num) if num.isdigit() else None
+
+
+def legacy_parse(html_path):
+    from bs4 import BeautifulSoup
+
+    with open(html_path, "r", encoding="utf-8", errors="ignore") as f:
+        html = f.read()
+
+    tbl = BeautifulSoup(html, "html.parser").find_all("table")[0]
+    data = [[c.get_text(strip=True) for c in row.find_all(["td", "th"])] for row in tbl.find_all("tr")]
+
+    df = pd.DataFrame([(r + [""] * 5)[:5] for r in data[1:]], columns=COLUMNS)
+    for col in PRICE_COLS:
+        df[col] = df[col].apply(legacy_extract_number)
+    df["ron"] = df["ron"].apply(lambda x: int(x) if str(x).isdigit() else None)
+    return df
+
+
+# --------------------------------------------------------
+# Synthetic pages
+# --------------------------------------------------------
+CELLS = [
+    "{p}<br><small>Pertamax</small>", "{p}Pertamax Green", "-", "0<br>Revvo92",
+    "<b>{p}</b> <!-- old: 9.999 -->BP ultimate", "  {p}  <br>\n  <small>V-Power Nitro+</small>  ",
+    "Price: {p} IDR", "na", "", "{p}&nbsp;&amp;more",
+]
+
+
+def synthetic_page(path, n_rows, n_tables, seed=0):
+    rng = np.random.default_rng(seed)
+    parts = ["<!doctype html><html><head><title>isibens.in</title>",
+             "<script>" + "var x = '<table>';" * 200 + "</script></head><body>",
+             "<!-- <table><tr><td>commented out</td></tr></table> -->",
+             "<table><thead><tr><th>RON</th><th><img src='p.png'><br></th>"
+             "<th>V</th><th>B</th><th>S</th></tr></thead><tbody>"]
+    for i in range(n_rows):
+        ron = str(88 + i % 12) if i % 17 else "RON?"
+        cells = [CELLS[rng.integers(len(CELLS))].format(p=f"{rng.integers(5, 30)}.{rng.integers(0, 1000):03d}")
+                 for _ in range(4 - (i % 23 == 0))]
+        parts.append(f"<tr><th scope='row'>{ron}</th>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+    parts.append("</tbody></table>")
+    for t in range(n_tables):
+        parts.append("<table>" + "<tr><th>CN</th><td>1.000</td></tr>" * 50 + "</table>")
+    parts.append("</body></html>")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def check(path):
+    expected = legacy_parse(path)
+    for chunk_size in CHUNK_SIZES:
+        got = table_frame(read_first_table(path, chunk_size))[1]
+        pd.testing.assert_frame_equal(got.astype("float64"), expected.astype("float64"))
+        assert got.to_csv(index=False) == expected.to_csv(index=False), f"CSV differs: {path}"
+
+
+def timed(fn, path):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+    print("\n=========== ISIBENS PARSER: STREAMING vs BEAUTIFULSOUP ===========")
+
+    snapshots = sorted(glob.glob(SNAPSHOTS))
+    for path in snapshots:
+        check(path)
+    print(f"[OK] parity on {len(snapshots)} snapshot(s) in {os.path.dirname(SNAPSHOTS)}/")
+
+    with tempfile.TemporaryDirectory() as d:
+        for seed in range(5):
+            path = os.path.join(d, f"synthetic_{seed}.html")
+            synthetic_page(path, 300, 3, seed)
+            check(path)
+        print("[OK] parity on 5 synthetic pages")
+
+        print(f"\n{'rows':>7s} {'page':>9s} {'bs4':>10s} {'streaming':>10s} {'speedup':>8s}")
+        for n in SCALE_ROWS:
+            path = os.path.join(d, f"large_{n}.html")
+            synthetic_page(path, n, SCALE_TABLES)
+            old = timed(legacy_parse, path)
+            new = timed(parse_isibens_table, path)
+            size = os.path.getsize(path) / 1e6
+            print(f"{n:7d} {size:7.2f}MB {old * 1e3:8.1f}ms {new * 1e3:8.1f}ms {old / new:7.1f}×")
@@ -0,0 +1,88 @@
+# benchmarks/load_visits.py
+#
+# Offline concurrency check for visit counting on the SQLite stand-in.
+# Many threads hammer the same few visitors; the atomic upsert must end
+# with exactly one increment per hit, while the old read-modify-write
+# pattern (select, then update) is shown losing increments.
+#
+# Run from backend/:  python -m benchmarks.load_visits [threads] [hits]
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import time
+
+from storage import SQLiteStorage
+
+VISITORS = ["a" * 64, "b" * 64, "c" * 64]
+
+
+def hammer(fn, threads, hits):
+    barrier = threading.Barrier(threads)
+
+    def worker(i):
+        barrier.wait()
+        for n in range(hits):
+            fn(VISITORS[(i + n) % len(VISITORS)])
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def run_atomic(path, threads, hits):
+    store = SQLiteStorage(path)
+    elapsed = hammer(
+        lambda h: store.increment_visits([{"ip_hash": h, "fp": None, "user_agent": "load", "count": 1}]),
+        threads, hits,
+    )
+    return sum(store.visit_count(h) for h in VISITORS), elapsed
+
+
+def run_read_modify_write(path, threads, hits):
+    """The pre-RPC track_visit pattern, for comparison."""
+    SQLiteStorage(path)  # create schema
+    local = threading.local()
+
+    def hit(h):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = sqlite3.connect(path, timeout=30)
+        row = conn.execute("SELECT id, visits FROM visits WHERE ip_hash = ?", (h,)).fetchone()
+        if row:
+            conn.execute("UPDATE visits SET visits = ? WHERE id = ?", (row[1] + 1, row[0]))
+        else:
+            conn.execute(
+                "INSERT OR IGNORE INTO visits (ip_hash, visits) VALUES (?, 1)", (h,)
+            )
+        conn.commit()
+
+    elapsed = hammer(hit, threads, hits)
+    conn = sqlite3.connect(path)
+    total = conn.execute("SELECT COALESCE(SUM(visits), 0) FROM visits").fetchone()[0]
+    return total, elapsed
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    hits = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    expected = threads * hits
+
+    with tempfile.TemporaryDirectory() as d:
+        total, elapsed = run_atomic(os.path.join(d, "atomic.db"), threads, hits)
+        print(f"[atomic upsert]     expected={expected} counted={total} "
+              f"lost={expected - total} ({expected / elapsed:,.0f} hits/s)")
+
+        total_rmw, elapsed = run_read_modify_write(os.path.join(d, "rmw.db"), threads, hits)
+        print(f"[read-modify-write] expected={expected} counted={total_rmw} "
+              f"lost={expected - total_rmw} ({expected / elapsed:,.0f} hits/s)")
+
+    if total != expected:
+        raise SystemExit("[ERROR] atomic upsert lost increments")
+    print("[OK] atomic upsert counted every hit")
@@ -0,0 +1,309 @@
+# pipeline/bar_cache.py
+#
+# Local cache of raw daily exog bars (one Close series per ticker).
+#
+#   data/cache/bars/
+#     ticker=BZ=F/year=2025/<sha12>.parquet   content-addressed partitions
+#     manifest.json                           current partition per ticker/year
+#     snapshots/<sha12>.json                  recent manifests
+#
+# A partition file is named by the hash of its bytes, so it is never
+# rewritten in place: an update writes a new file and a new manifest. A
+# snapshot id therefore pins an exact, reproducible set of daily bars, as
+# long as the snapshot is kept: every update prunes down to the
+# KEEP_SNAPSHOTS latest snapshots written by each ticker's updates and
+# deletes the partitions none of them refer to.
+#
+# The layout is for content addressing and reproducibility, not size. An
+# update rewrites only the years it touched, and snapshots share every
+# other partition. Each small file carries its own Parquet footer and
+# schema, so the bars take about as much disk as the same data in CSV,
+# or slightly more.
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+CACHE_DIR = os.getenv("EXOG_CACHE_DIR", "data/cache/bars")
+
+# Bars younger than this are served without touching the network
+TTL_HOURS = float(os.getenv("EXOG_CACHE_TTL_HOURS", "12"))
+
+# Days re-fetched before the last cached bar when refreshing a stale ticker
+REFRESH_OVERLAP_DAYS = 7
+
+# Snapshots kept per ticker (each update of a ticker writes one)
+KEEP_SNAPSHOTS = int(os.getenv("EXOG_CACHE_KEEP_SNAPSHOTS", "10"))
+
+COMPRESSION = "zstd"
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def normalize_bars(df):
+    """Close series indexed by tz-naive trading date, sorted, one row per day."""
+    out = df[["Close"]].astype("float64")
+    index = pd.DatetimeIndex(out.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    out.index = index.normalize().rename("Date")
+
+    out = out[~out.index.duplicated(keep="last")]
+    return out.sort_index()
+
+
+class BarCache:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self._lock = threading.Lock()
+
+    # ----- manifest -----
+    def manifest(self, snapshot=None):
+        path = (
+            os.path.join(self.cache_dir, "snapshots", f"{snapshot}.json")
+            if snapshot else self.manifest_path
+        )
+        if not os.path.exists(path):
+            if snapshot:
+                raise FileNotFoundError(f"Unknown bar cache snapshot: {snapshot}")
+            return {"tickers": {}}
+
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        data = json.dumps(manifest, indent=2, sort_keys=True).encode()
+        snapshot = _sha(data)[:12]
+
+        snap_dir = os.path.join(self.cache_dir, "snapshots")
+        os.makedirs(snap_dir, exist_ok=True)
+        snap_path = os.path.join(snap_dir, f"{snapshot}.json")
+        if not os.path.exists(snap_path):
+            _write_atomic(snap_path, data)
+
+        _write_atomic(self.manifest_path, data)
+        return snapshot
+
+    def snapshot_id(self):
+        """Id of the current manifest (None for an empty cache)."""
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, "rb") as f:
+            return _sha(f.read())[:12]
+
+    # ----- read -----
+    def info(self, ticker, snapshot=None):
+        """{"from", "last", "fetched_at", "years": {year: {...}}} or None."""
+        return self.manifest(snapshot)["tickers"].get(ticker)
+
+    def age_hours(self, ticker):
+        info = self.info(ticker)
+        if info is None:
+            return None
+        return (time.time() - info["fetched_at"]) / 3600
+
+    def read(self, ticker, start=None, end=None, snapshot=None):
+        """Cached bars for one ticker (empty frame if nothing is cached)."""
+        info = self.info(ticker, snapshot)
+        empty = pd.DataFrame({"Close": pd.Series(dtype="float64")},
+                             index=pd.DatetimeIndex([], name="Date"))
+        if info is None:
+            return empty
+
+        first = pd.Timestamp(start).year if start else None
+        last = pd.Timestamp(end).year if end else None
+
+        frames = []
+        for year, part in sorted(info["years"].items()):
+            if (first and int(year) < first) or (last and int(year) > last):
+                continue
+            frames.append(pd.read_parquet(os.path.join(self.cache_dir, part["file"])))
+
+        if not frames:
+            return empty
+
+        df = pd.concat(frames)
+        if start:
+            df = df.loc[df.index >= pd.Timestamp(start)]
+        if end:
+            df = df.loc[df.index <= pd.Timestamp(end)]
+        return df
+
+    def read_daily(self, tickers, start=None, end=None, snapshot=None):
+        """Joined daily frame, one column per {column: ticker} (feature work)."""
+        frames = [
+            self.read(ticker, start, end, snapshot).rename(columns={"Close": col})
+            for col, ticker in tickers.items()
+        ]
+        df = frames[0]
+        for frame in frames[1:]:
+            df = df.join(frame, how="outer")
+        return df
+
+    # ----- write -----
+    def _write_partition(self, ticker, year, bars):
+        buf = io.BytesIO()
+        bars.to_parquet(buf, compression=COMPRESSION)
+        data = buf.getvalue()
+        digest = _sha(data)
+
+        rel = os.path.join(f"ticker={ticker}", f"year={year}", f"{digest[:12]}.parquet")
+        path = os.path.join(self.cache_dir, rel)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, data)
+
+        return {
+            "file": rel,
+            "sha256": digest,
+            "rows": len(bars),
+            "first": bars.index.min().strftime("%Y-%m-%d"),
+            "last": bars.index.max().strftime("%Y-%m-%d"),
+        }
+
+    def update(self, ticker, bars, start):
+        """
+        Merge freshly fetched bars (fetched from `start`) into the cache;
+        fresh values win on overlapping days. Only the years present in
+        `bars` are rewritten. Returns the new snapshot id.
+        """
+        bars = normalize_bars(bars)
+
+        with self._lock:
+            manifest = self.manifest()
+            info = manifest["tickers"].get(ticker) or {"from": start, "years": {}}
+
+            for year, fresh in bars.groupby(bars.index.year):
+                year = str(year)
+                part = info["years"].get(year)
+                if part is not None:
+                    old = pd.read_parquet(os.path.join(self.cache_dir, part["file"]))
+                    fresh = normalize_bars(pd.concat([old, fresh]))
+                info["years"][year] = self._write_partition(ticker, year, fresh)
+
+            info["from"] = min(info["from"], start)
+            info["last"] = max(p["last"] for p in info["years"].values()) if info["years"] else None
+            info["fetched_at"] = time.time()
+            manifest["tickers"][ticker] = info
+
+            snapshot = self._write_manifest(manifest)
+            self._prune(KEEP_SNAPSHOTS)
+            return snapshot
+
+    def prune(self, keep=None):
+        """
+        Keep the `keep` latest snapshots written by each ticker's updates
+        (and the current manifest), delete the others and every partition
+        file no kept snapshot refers to. Returns the number of partitions
+        removed.
+        """
+        with self._lock:
+            return self._prune(KEEP_SNAPSHOTS if keep is None else keep)
+
+    def _prune(self, keep):
+        snap_dir = os.path.join(self.cache_dir, "snapshots")
+        names = [n for n in os.listdir(snap_dir) if n.endswith(".json")] if os.path.isdir(snap_dir) else []
+
+        # every snapshot was written by update() of the ticker with the
+        # newest fetched_at in it; keep the `keep` latest of each ticker
+        manifests, written = {}, {}
+        for name in names:
+            with open(os.path.join(snap_dir, name), "r") as f:
+                manifests[name] = json.load(f)
+            tickers = manifests[name]["tickers"]
+            if tickers:
+                ticker = max(tickers, key=lambda t: tickers[t]["fetched_at"])
+                written.setdefault(ticker, []).append((tickers[ticker]["fetched_at"], name))
+
+        current = self.snapshot_id()
+        kept = {f"{current}.json"} if current else set()
+        for stamps in written.values():
+            kept.update(name for _, name in sorted(stamps, reverse=True)[:keep])
+
+        referenced = set()
+        for manifest in [self.manifest()] + [manifests[n] for n in kept if n in manifests]:
+            for info in manifest["tickers"].values():
+                referenced.update(p["file"] for p in info["years"].values())
+
+        for name in names:
+            if name not in kept:
+                os.remove(os.path.join(snap_dir, name))
+
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".parquet"):
+                    continue
+                rel = os.path.relpath(os.path.join(root, name), self.cache_dir)
+                if rel not in referenced:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+
+class CachedFetcher:
+    """
+    Wrap a fetcher(ticker, start) with the bar cache:
+      cached from `start` and younger than the TTL → served locally
+      cached from `start` but stale              → fetch only the tail
+                                                   (REFRESH_OVERLAP_DAYS back)
+      not cached that far back                   → fetch from `start`
+    Every network result is merged into the cache before it is returned,
+    unless cancel(ticker) was called while it was in flight.
+    """
+
+    def __init__(self, fetcher, cache=None, ttl_hours=None):
+        self.fetcher = fetcher
+        self.cache = cache or BarCache()
+        self.ttl_hours = TTL_HOURS if ttl_hours is None else ttl_hours
+        self.hits = 0
+        self.misses = 0
+        self._generation = {}
+        self._lock = threading.Lock()
+
+    def cancel(self, ticker):
+        """Discard the result of calls for `ticker` still in flight (e.g. abandoned on timeout)."""
+        with self._lock:
+            self._generation[ticker] = self._generation.get(ticker, 0) + 1
+
+    def __call__(self, ticker, start):
+        with self._lock:
+            generation = self._generation.get(ticker, 0)
+
+        info = self.cache.info(ticker)
+        covered = info is not None and info["from"] <= start and info.get("last")
+
+        if covered and self.cache.age_hours(ticker) < self.ttl_hours:
+            self.hits += 1
+            return self.cache.read(ticker, start)
+
+        if covered:
+            tail = pd.Timestamp(info["last"]) - pd.Timedelta(days=REFRESH_OVERLAP_DAYS)
+            fetch_from = max(start, tail.strftime("%Y-%m-%d"))
+        else:
+            fetch_from = start
+
+        self.misses += 1
+        fresh = self.fetcher(ticker, fetch_from)
+        with self._lock:
+            if self._generation.get(ticker, 0) != generation:
+                return None  # cancelled: the caller has given up on this call
+            if fresh is not None and not fresh.empty:
+                self.cache.update(ticker, fresh, fetch_from)
+
+        return self.cache.read(ticker, start)
@@ -1,10 +1,10 @@
 import pandas as pd
-import os
+
+from pipeline.data_store import write_dataset
 
 def clean_dataset():
 
     input_path = "data/processed/merged_data.csv"
-    output_path = "data/processed/merged_data_clean.csv"
 
     print("1. Loading your merged dataset...")
     df = pd.read_csv(input_path)
@@ -35,8 +35,7 @@ def clean_dataset():
 
     # 7. Save
     print("6. Saving cleaned dataset...")
-    os.makedirs("data/processed", exist_ok=True)
-    df.to_csv(output_path, index=False)
+    output_path = write_dataset("merged_clean", df)
 
     print(f"SUCCESS: Cleaned dataset saved to {output_path}")
 
@@ -0,0 +1,162 @@
+# pipeline/data_store.py
+#
+# Typed columnar storage for the processed datasets in data/processed/.
+#
+# Every dataset has an explicit schema (month as a monthly Period, date as
+# datetime64, fuel prices as float32, exog series as float64) and is stored
+# as <file>.parquet, so readers get the right types back without
+# re-parsing or re-inferring them. A CSV with the same base name is only
+# read as a fallback (older checkouts); `python -m pipeline.data_store
+# migrate` converts those once, `export <dataset>` writes a CSV for
+# inspection.
+
+import os
+import sys
+
+import pandas as pd
+
+PROCESSED_DIR = os.getenv(
+    "PROCESSED_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "processed")),
+)
+
+COMPRESSION = "zstd"
+
+TARGET_COLS = [
+    "pertamina_90","pertamina_92","pertamina_95","pertamina_98",
+    "shell_92","shell_95","shell_98",
+    "bp_92","bp_95",
+    "vivo_90","vivo_92","vivo_95",
+]
+
+EXOG_COLS = [
+    "brent", "rbob", "usd_idr",
+    "rbob_liter", "base_mops",
+    "RON92", "RON95", "RON98", "RON90",
+]
+
+MONTH = "period[M]"
+DATE = "datetime64[ns]"
+PRICE = "float32"    # IDR pump prices: whole rupiah, exact in float32
+SERIES = "float64"   # market series keep full precision (model inputs)
+
+KEYS = {"month": MONTH, "date": DATE}
+PRICES = {c: PRICE for c in TARGET_COLS}
+EXOGS = {c: SERIES for c in EXOG_COLS}
+
+SCHEMAS = {
+    "fuel": {"file": "fuel_price_indonesia_clean", "columns": {**KEYS, **PRICES}},
+    "exog": {"file": "exog_history", "columns": {**KEYS, **EXOGS}},
+    "merged": {"file": "merged_dataset", "columns": {**KEYS, **PRICES, **EXOGS}},
+    "merged_clean": {"file": "merged_data_clean", "columns": {**KEYS, **PRICES, **EXOGS}},
+}
+
+
+# --------------------------------------------------------
+# Paths
+# --------------------------------------------------------
+def dataset_path(name, fmt="parquet", base=None):
+    return os.path.join(base or PROCESSED_DIR, f"{SCHEMAS[name]['file']}.{fmt}")
+
+
+def dataset_exists(name, base=None):
+    return any(os.path.exists(dataset_path(name, fmt, base)) for fmt in ("parquet", "csv"))
+
+
+# --------------------------------------------------------
+# Schema
+# --------------------------------------------------------
+def apply_schema(name, df):
+    """
+    Cast a frame to the dataset schema. month / date are derived from each
+    other when one is missing; columns outside the schema are kept as-is.
+    """
+    columns = SCHEMAS[name]["columns"]
+    df = df.copy()
+
+    if "date" in df.columns and df["date"].dtype != DATE:
+        df["date"] = pd.to_datetime(df["date"]).astype(DATE)
+    if "month" in df.columns:
+        month = df["month"]
+        if not isinstance(month.dtype, pd.PeriodDtype):
+            month = pd.PeriodIndex(month.astype(str), freq="M")
+        df["month"] = month
+
+    if "month" in columns and "month" not in df.columns and "date" in df.columns:
+        df["month"] = df["date"].dt.to_period("M")
+    if "date" in columns and "date" not in df.columns and "month" in df.columns:
+        df["date"] = df["month"].dt.to_timestamp().astype(DATE)
+
+    for col, dtype in columns.items():
+        if col in KEYS or col not in df.columns:
+            continue
+        if df[col].dtype != dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+
+    return df
+
+
+# --------------------------------------------------------
+# Read / write
+# --------------------------------------------------------
+def read_file(path, name):
+    """Read a dataset file (Parquet or CSV fallback) and apply its schema."""
+    if path.endswith(".parquet"):
+        return apply_schema(name, pd.read_parquet(path))
+    return apply_schema(name, pd.read_csv(path))
+
+
+def read_dataset(name, base=None):
+    if name == "fuel":
+        # base file + months appended since (pipeline.history_store);
+        # imported here, history_store imports this module
+        from pipeline.history_store import MonthStore
+        return MonthStore(base).read()
+
+    for fmt in ("parquet", "csv"):
+        path = dataset_path(name, fmt, base)
+        if os.path.exists(path):
+            return read_file(path, name)
+
+    raise FileNotFoundError(f"Dataset '{name}' not found in {base or PROCESSED_DIR}")
+
+
+def write_dataset(name, df, base=None):
+    """Schema-cast and write <file>.parquet atomically (temp file + rename)."""
+    path = dataset_path(name, "parquet", base)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    df = apply_schema(name, df).reset_index(drop=True)
+
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, compression=COMPRESSION, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+# --------------------------------------------------------
+# CLI: migrate CSVs / export a dataset as CSV
+# --------------------------------------------------------
+def migrate(base=None):
+    for name in SCHEMAS:
+        csv_path = dataset_path(name, "csv", base)
+        if os.path.exists(csv_path) and not os.path.exists(dataset_path(name, "parquet", base)):
+            out = write_dataset(name, read_file(csv_path, name), base)
+            print(f"[OK] {csv_path} → {out}")
+
+
+def export_csv(name, out_path=None, base=None):
+    df = read_dataset(name, base)
+    out_path = out_path or dataset_path(name, "csv", base)
+    df.to_csv(out_path, index=False)
+    print(f"[OK] {name} → {out_path}")
+    return out_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        migrate()
+    elif len(sys.argv) >= 3 and sys.argv[1] == "export":
+        export_csv(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    else:
+        print("usage: python -m pipeline.data_store migrate | export <dataset> [out.csv]")
@@ -1,28 +1,211 @@
 import pandas as pd
-import yfinance as yf
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline.data_store import apply_schema, dataset_exists, read_dataset, write_dataset
+
+# yfinance is imported inside YFinanceFetcher: it is slow to import and
+# only the refresh step needs it (the API uses derive_exog_features only).
 
-EXOG_PATH = "data/processed/exog_history.csv"
 START_DATE = "2022-01-01"
 
+# Months re-fetched before the last stored one, so late revisions (and the
+# partial month stored by the previous run) are picked up
+OVERLAP_MONTHS = 1
+
+# Offline runs: read <ticker>.csv files from this directory instead of Yahoo
+FIXTURE_DIR = os.getenv("EXOG_FIXTURE_DIR")
+
+# Keep raw daily bars in the local Parquet cache (pipeline/bar_cache.py)
+USE_BAR_CACHE = os.getenv("EXOG_CACHE", "1") != "0"
+
+# column → Yahoo ticker; override with EXOG_TICKERS="brent=BZ=F,rbob=RB=F,..."
+DEFAULT_TICKERS = {
+    "brent": "BZ=F",
+    "rbob": "RB=F",
+    "usd_idr": "USDIDR=X",
+}
+
+
+def parse_tickers(value):
+    tickers = {}
+    for item in value.split(","):
+        col, _, ticker = item.strip().partition("=")
+        if not col or not ticker:
+            raise ValueError(f"EXOG_TICKERS entries must be column=TICKER, got {item!r}")
+        tickers[col] = ticker
+    return tickers
+
+
+TICKERS = parse_tickers(os.environ["EXOG_TICKERS"]) if os.getenv("EXOG_TICKERS") else DEFAULT_TICKERS
+
+# Tickers are fetched concurrently; each attempt gets FETCH_TIMEOUT seconds
+# and a failed ticker is retried FETCH_RETRIES times with exponential
+# backoff (FETCH_BACKOFF, 2×, 4×, … seconds)
+FETCH_WORKERS = int(os.getenv("EXOG_FETCH_WORKERS", "0")) or None
+FETCH_TIMEOUT = float(os.getenv("EXOG_FETCH_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.getenv("EXOG_FETCH_RETRIES", "2"))
+FETCH_BACKOFF = float(os.getenv("EXOG_FETCH_BACKOFF", "1.0"))
+
 
 # ----------------------------------------------------------
-# Fetch full historical daily data
+# Daily close fetchers: fetcher(ticker, start) → DataFrame[Close]
 # ----------------------------------------------------------
-def fetch_full_daily():
-    print("\n[INFO] Fetching full historical EXOG daily data (Jan 2022 → today)…")
+class YFinanceFetcher:
+    def __init__(self, timeout=FETCH_TIMEOUT):
+        self.timeout = timeout
+
+    def __call__(self, ticker, start):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).history(start=start, timeout=self.timeout)[["Close"]]
+
+
+class FixtureFetcher:
+    """
+    Local daily bars for offline runs: <fixture_dir>/<ticker>.csv with
+    Date and Close columns (e.g. recorded with save_fixture()).
+    Every call is logged in .calls as (ticker, start, rows returned).
+    """
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.calls = []
+
+    def path(self, ticker):
+        return os.path.join(self.fixture_dir, f"{ticker}.csv")
+
+    def __call__(self, ticker, start):
+        df = pd.read_csv(self.path(ticker), parse_dates=["Date"], index_col="Date")
+        df = df.loc[df.index >= pd.Timestamp(start), ["Close"]]
+
+        self.calls.append((ticker, start, len(df)))
+        return df
+
+
+def save_fixture(daily, fixture_dir, tickers=None):
+    """Record a joined daily frame (as from fetch_daily) as fixture files."""
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    for col, ticker in (tickers or TICKERS).items():
+        out = daily[[col]].dropna().rename(columns={col: "Close"})
+        out.index = out.index.tz_localize(None) if out.index.tz is not None else out.index
+        out.index.name = "Date"
+        out.to_csv(os.path.join(fixture_dir, f"{ticker}.csv"))
+
 
-    brent = yf.Ticker("BZ=F").history(start=START_DATE)[["Close"]].rename(columns={"Close": "brent"})
-    rbob = yf.Ticker("RB=F").history(start=START_DATE)[["Close"]].rename(columns={"Close": "rbob"})
-    usd_idr = yf.Ticker("USDIDR=X").history(start=START_DATE)[["Close"]].rename(columns={"Close": "usd_idr"})
+def default_fetcher():
+    if FIXTURE_DIR:
+        return FixtureFetcher(FIXTURE_DIR)
+    if USE_BAR_CACHE:
+        from pipeline.bar_cache import CachedFetcher
+        return CachedFetcher(YFinanceFetcher())
+    return YFinanceFetcher()
 
-    df = brent.join(rbob, how="outer").join(usd_idr, how="outer")
+
+# ----------------------------------------------------------
+# Fetch daily data from `start` (defaults to the full history)
+# ----------------------------------------------------------
+def call_with_timeout(fn, timeout, *args):
+    """
+    Run fn(*args) on a daemon thread and wait at most `timeout` seconds.
+    A call that times out is abandoned (threads cannot be killed); being a
+    daemon it does not hold up interpreter exit.
+    """
+    result = {}
+
+    def target():
+        try:
+            result["value"] = fn(*args)
+        except BaseException as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+
+    if worker.is_alive():
+        raise TimeoutError(f"no response after {timeout:.1f}s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def fetch_ticker(fetcher, ticker, start, timeout=None, retries=None, backoff=None):
+    """One ticker with per-attempt timeout and retry + exponential backoff."""
+    timeout = FETCH_TIMEOUT if timeout is None else timeout
+    retries = FETCH_RETRIES if retries is None else retries
+    backoff = FETCH_BACKOFF if backoff is None else backoff
+
+    for attempt in range(retries + 1):
+        try:
+            df = call_with_timeout(fetcher, timeout, ticker, start)
+            if df is None or df.empty:
+                raise ValueError("empty response")
+            return df
+
+        except Exception as e:
+            # a timed-out call keeps running on its abandoned thread; a
+            # caching fetcher must not store whatever it returns later
+            if isinstance(e, TimeoutError) and hasattr(fetcher, "cancel"):
+                fetcher.cancel(ticker)
+
+            if attempt == retries:
+                raise RuntimeError(f"{ticker}: {e} (after {attempt + 1} attempts)") from e
+
+            delay = backoff * 2 ** attempt
+            print(f"[WARN] {ticker}: {e}, retrying in {delay:.1f}s…")
+            time.sleep(delay)
+
+
+def fetch_daily(start=START_DATE, fetcher=None, tickers=None, workers=None, **retry):
+    """
+    Fetch every ticker concurrently and outer-join the closes into one
+    daily frame, columns in `tickers` order. `retry` takes fetch_ticker's
+    timeout / retries / backoff.
+    """
+    fetcher = fetcher or default_fetcher()
+    tickers = tickers or TICKERS
+    workers = workers or FETCH_WORKERS or len(tickers)
+    print(f"\n[INFO] Fetching EXOG daily data for {len(tickers)} tickers ({start} → today)…")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            col: pool.submit(fetch_ticker, fetcher, ticker, start, **retry)
+            for col, ticker in tickers.items()
+        }
+
+        frames, failed = [], []
+        for col, fut in futures.items():
+            try:
+                frames.append(fut.result().rename(columns={"Close": col}))
+            except Exception as e:
+                failed.append(str(e))
+
+    if failed:
+        raise RuntimeError("EXOG fetch failed: " + "; ".join(failed))
+
+    df = frames[0]
+    for frame in frames[1:]:
+        df = df.join(frame, how="outer")
     df = df.dropna(how="all")
 
     print(f"[OK] Daily rows fetched: {len(df)}")
     return df
 
 
+def fetch_full_daily(fetcher=None):
+    return fetch_daily(START_DATE, fetcher)
+
+
+def refresh_start(old):
+    """First day to fetch: OVERLAP_MONTHS before the last stored month."""
+    last = pd.Period(old["month"].max(), freq="M")
+    return (last - OVERLAP_MONTHS).start_time.strftime("%Y-%m-%d")
+
+
 # ---------------------------------------------------------- 
 # Convert daily → monthly (use last day of month)
 # Then convert index to YYYY-MM-01
@@ -46,12 +229,8 @@ def convert_to_monthly(df):
 # ----------------------------------------------------------
 # Enrich with RON buckets + RBOB/L
 # ----------------------------------------------------------
-def enrich_exogs(monthly):
-
-    print("[INFO] Enriching EXOG data…")
-
-    m = monthly.copy()
-
+def derive_exog_features(m):
+    """Derived model features from brent/rbob/usd_idr (in place, returned)."""
     m["rbob_liter"] = m["rbob"] / 3.78541
     m["base_mops"] = m["rbob"]
 
@@ -60,6 +239,15 @@ def enrich_exogs(monthly):
     m["RON98"] = m["rbob_liter"] + 0.12
     m["RON90"] = m["rbob_liter"] - 0.04
 
+    return m
+
+
+def enrich_exogs(monthly):
+
+    print("[INFO] Enriching EXOG data…")
+
+    m = derive_exog_features(monthly.copy())
+
     m["month"] = m.index.strftime("%Y-%m")
     m["date"] = m.index.strftime("%Y-%m-01")
 
@@ -67,31 +255,47 @@ def enrich_exogs(monthly):
 
 
 # ----------------------------------------------------------
-# Update exog_history.csv
+# Update the exog history dataset
 # ----------------------------------------------------------
-def update_exog_history():
+def update_exog_history(fetcher=None, full=False):
+    """
+    Incremental by default: fetch only from OVERLAP_MONTHS before the last
+    stored month; re-fetched months replace the stored ones. full=True
+    (or a missing exog dataset) rebuilds from START_DATE.
+    """
 
     print("\n=============== UPDATE EXOG HISTORY ===============")
 
-    df_daily = fetch_full_daily()
-    df_monthly = convert_to_monthly(df_daily)
-    df_enriched = enrich_exogs(df_monthly)
+    old = None
+    start = START_DATE
+    if dataset_exists("exog") and not full:
+        print("[INFO] Loading existing exog history…")
+        old = read_dataset("exog")
+        if len(old):
+            start = refresh_start(old)
 
-    if os.path.exists(EXOG_PATH):
-        print("[INFO] Loading existing exog_history.csv…")
-        old = pd.read_csv(EXOG_PATH)
+    df_daily = fetch_daily(start, fetcher)
+    if df_daily.empty:
+        print("[WARN] No EXOG data returned, keeping exog history as is")
+        return old
+
+    df_monthly = convert_to_monthly(df_daily)
+    df_enriched = apply_schema("exog", enrich_exogs(df_monthly))
 
+    if old is not None:
         merged = pd.concat([old, df_enriched], ignore_index=True)
 
-        merged = merged.drop_duplicates(subset=["month"])
+        # fresh values win for the overlapping months
+        merged = merged.drop_duplicates(subset=["month"], keep="last")
         merged = merged.sort_values("month")
+        print(f"[INFO] Refreshed months {df_enriched['month'].min()} → {df_enriched['month'].max()}")
     else:
-        print("[INFO] Creating new exog_history.csv…")
+        print("[INFO] Creating new exog history…")
         merged = df_enriched.copy()
 
-    merged.to_csv(EXOG_PATH, index=False)
+    out_path = write_dataset("exog", merged)
 
-    print(f"[OK] exog_history.csv updated → {EXOG_PATH}")
+    print(f"[OK] exog history updated → {out_path}")
     print(f"[INFO] Total months stored: {len(merged)}")
 
     return merged
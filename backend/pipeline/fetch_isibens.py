@@ -1,33 +1,186 @@
+# pipeline/fetch_isibens.py
+#
+# Daily download of the ISIBENS price page.
+#
+#   data/isibens/
+#     isibens_<YYYYMMDD>.csv   one file per fetch day
+#     index.json               validators of the last response + one entry
+#                              per distinct payload (sha256 → first file)
+#
+# The download is a conditional GET (If-None-Match / If-Modified-Since
+# from the last response). A 304, or a 200 whose payload hashes to a
+# snapshot already stored, links today's file to that snapshot instead
+# of writing a copy. The index also records the last payload the
+# pipeline fully processed, so run_monthly_pipeline can skip retraining
+# when neither the page nor the merged dataset changed since.
+
+import hashlib
+import json
 import os
-import requests
+import shutil
+import time
 from datetime import datetime
 
+import requests
+
 BASE_DIR = "data/isibens"
 os.makedirs(BASE_DIR, exist_ok=True)
 
+URL = os.getenv("ISIBENS_URL", "https://isibens.in/unduh/harga-bbm.csv")
+TIMEOUT = 10
 
-def fetch_isibens_file():
+
+# --------------------------------------------------------
+# Snapshot index
+# --------------------------------------------------------
+def index_path(base_dir=None):
+    return os.path.join(base_dir or BASE_DIR, "index.json")
+
+
+def load_index(base_dir=None):
+    path = index_path(base_dir)
+    if not os.path.exists(path):
+        return {"validators": {}, "snapshots": {}, "latest": None, "processed": None}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_index(index, base_dir=None):
+    path = index_path(base_dir)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def mark_processed(sha256, base_dir=None):
+    """Record that the pipeline completed on this payload."""
+    index = load_index(base_dir)
+    index["processed"] = sha256
+    save_index(index, base_dir)
+
+
+def _file_sha(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _link(src, dst):
+    """dst becomes the same file as src (hard link, copy where unsupported)."""
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return
+    tmp = f"{dst}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+# --------------------------------------------------------
+# Download
+# --------------------------------------------------------
+def fetch_isibens_snapshot(url=None, base_dir=None, date=None):
     """
-    Downloads the ISIBENS CSV-wrapped HTML file.
-    Returns the local file path.
+    Conditionally download today's snapshot.
+
+    Returns {"path", "sha256", "status", "changed", "processed"}; `path`
+    always holds the returned payload:
+      status     "new" (payload never seen), "duplicate" (200 with a known
+                 payload) or "not-modified" (304)
+      changed    payload differs from the previous fetch
+      processed  the pipeline already completed on this payload
     """
+    url = url or URL
+    base_dir = base_dir or BASE_DIR
+    os.makedirs(base_dir, exist_ok=True)
+
+    day = (date or datetime.today()).strftime("%Y%m%d")
+    filepath = os.path.join(base_dir, f"isibens_{day}.csv")
 
-    url = "https://isibens.in/unduh/harga-bbm.csv"   # same URL you used
-    today_str = datetime.today().strftime("%Y%m%d")
-    filename = f"isibens_{today_str}.csv"
-    filepath = os.path.join(BASE_DIR, filename)
+    index = load_index(base_dir)
+    stored = {
+        sha: snap for sha, snap in index["snapshots"].items()
+        if os.path.exists(os.path.join(base_dir, snap["file"]))
+    }
+    latest = stored.get(index["latest"]) if index["latest"] else None
+
+    headers = {}
+    if latest is not None:
+        validators = index["validators"]
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
 
     print(f"[INFO] Downloading CSV → {filepath}")
+    response = requests.get(url, headers=headers, timeout=TIMEOUT)
+
+    if response.status_code == 304 and latest is not None:
+        sha256 = index["latest"]
+        status = "not-modified"
+    else:
+        response.raise_for_status()
+        payload = response.text.encode("utf-8")
+        sha256 = hashlib.sha256(payload).hexdigest()
+        status = "duplicate" if sha256 in stored else "new"
+
+        if status == "new":
+            tmp = f"{filepath}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, filepath)
+            # a same-day re-fetch replaces that day's file
+            name = os.path.basename(filepath)
+            index["snapshots"] = {k: v for k, v in index["snapshots"].items() if v["file"] != name}
+            index["snapshots"][sha256] = {"file": name, "first_seen": day}
+
+        index["validators"] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
 
-    response = requests.get(url, timeout=10)
-    response.raise_for_status()
+    snapshot = index["snapshots"][sha256]
+    if status != "new":
+        # link today's file to the snapshot unless today already has a file
+        # with other content (same-day refetch returning an older payload):
+        # that file belongs to another snapshot, so only the hit is recorded
+        source = os.path.join(base_dir, snapshot["file"])
+        if not os.path.exists(filepath) or _file_sha(filepath) == sha256:
+            _link(source, filepath)
+        else:
+            snapshot.setdefault("hits", []).append(day)
+            filepath = source
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(response.text)
+    changed = sha256 != index["latest"]
+    snapshot["last_seen"] = day
+    snapshot["fetched_at"] = time.time()
+    index["latest"] = sha256
+    save_index(index, base_dir)
 
-    print("[OK] CSV downloaded successfully.")
-    return filepath
+    if status == "new":
+        print("[OK] CSV downloaded successfully.")
+    else:
+        print(f"[OK] Unchanged payload ({status}) — linked to {snapshot['file']}")
+
+    return {
+        "path": filepath,
+        "sha256": sha256,
+        "status": status,
+        "changed": changed,
+        "processed": sha256 == index.get("processed"),
+    }
+
+
+def fetch_isibens_file():
+    """
+    Downloads the ISIBENS CSV-wrapped HTML file.
+    Returns the local file path.
+    """
+    return fetch_isibens_snapshot()["path"]
 
 
 if __name__ == "__main__":
-    print(fetch_isibens_file())
\ No newline at end of file
+    print(fetch_isibens_snapshot())
@@ -0,0 +1,288 @@
+# pipeline/history_store.py
+#
+# Append-only, month-keyed store for the monthly fuel price history.
+#
+#   data/processed/fuel_price_indonesia_clean.parquet   compacted base
+#   data/processed/fuel_history/
+#     base.json                   months held by the base (+ its size/mtime)
+#     index.json                  {"segments": {month: file}} appended months
+#     segments/<YYYY-MM>.parquet  one file per month appended since compaction
+#
+# Adding a month writes one small segment and then index.json, each to a
+# temp file renamed into place; index.json is the commit point, so a crash
+# in between leaves an orphan segment that is simply rewritten on retry.
+# Neither the check for an existing month nor an append touches the base,
+# so both cost the same however long the history is. compact() folds the
+# segments back into the base (python -m pipeline.history_store compact).
+
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+from pipeline import data_store
+from pipeline.data_store import TARGET_COLS, apply_schema, dataset_path, write_dataset
+
+DATASET = "fuel"
+STORE_DIR = "fuel_history"
+
+# ISIBENS table (one row per RON, one column per provider) → fuel columns
+COLUMN_MAP = {
+    "90": {"pertamina": "pertamina_90", "vivo": "vivo_90"},
+    "92": {"pertamina": "pertamina_92", "vivo": "vivo_92", "bp": "bp_92", "shell": "shell_92"},
+    "95": {"pertamina": "pertamina_95", "vivo": "vivo_95", "bp": "bp_95", "shell": "shell_95"},
+    "98": {"pertamina": "pertamina_98", "shell": "shell_98"},
+}
+
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _write_json_atomic(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class MonthStore:
+    def __init__(self, base=None):
+        self.base = base or data_store.PROCESSED_DIR
+        self.dir = os.path.join(self.base, STORE_DIR)
+        self.base_path = dataset_path(DATASET, "parquet", self.base)
+        self.base_index_path = os.path.join(self.dir, "base.json")
+        self.index_path = os.path.join(self.dir, "index.json")
+        self._base = None        # (stamp, set of months)
+        self._segments = None    # (index.json mtime, {month: file})
+
+    # ----- base months -----
+    def _base_stamp(self):
+        """[size, mtime] of the base file, so a base rewritten elsewhere is noticed."""
+        if not os.path.exists(self.base_path):
+            return None
+        st = os.stat(self.base_path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def base_months(self):
+        stamp = self._base_stamp()
+        if self._base is not None and self._base[0] == stamp:
+            return self._base[1]
+
+        saved = _read_json(self.base_index_path) if os.path.exists(self.base_index_path) else None
+        if saved is not None and saved["stamp"] == stamp:
+            self._base = (stamp, set(saved["months"]))
+            return self._base[1]
+
+        # first run, or the base was rewritten (compact() interrupted, or
+        # written directly through data_store): re-read its months once
+        months = set()
+        if stamp is not None:
+            base = apply_schema(DATASET, pd.read_parquet(self.base_path, columns=["month"]))
+            months = set(base["month"].astype(str))
+        os.makedirs(self.dir, exist_ok=True)
+        _write_json_atomic(self.base_index_path, {"stamp": stamp, "months": sorted(months)})
+        self._base = (stamp, months)
+
+        # the base wins for months it already holds
+        segments = self.segments() if os.path.exists(self.index_path) else {}
+        stale = {m: f for m, f in segments.items() if m in months}
+        if stale:
+            self._save_segments({m: f for m, f in segments.items() if m not in stale})
+            self._remove_segment_files(stale)
+        print(f"[INFO] Indexed fuel history base: {len(months)} months")
+        return months
+
+    # ----- appended months -----
+    def segments(self):
+        """{month: segment file} committed in index.json."""
+        if not os.path.exists(self.index_path):
+            # lost index: every complete segment file for a month the base
+            # does not hold was appended
+            seg_dir = os.path.join(self.dir, "segments")
+            names = sorted(os.listdir(seg_dir)) if os.path.isdir(seg_dir) else []
+            found = {
+                name[:-len(".parquet")]: os.path.join("segments", name)
+                for name in names if name.endswith(".parquet")
+            }
+            base = self.base_months()
+            self._save_segments({m: f for m, f in found.items() if m not in base})
+
+        mtime = os.stat(self.index_path).st_mtime_ns
+        if self._segments is None or self._segments[0] != mtime:
+            self._segments = (mtime, _read_json(self.index_path)["segments"])
+        return self._segments[1]
+
+    def _save_segments(self, segments):
+        os.makedirs(self.dir, exist_ok=True)
+        _write_json_atomic(self.index_path, {"segments": segments})
+        self._segments = None
+
+    def _remove_segment_files(self, segments):
+        for rel in segments.values():
+            path = os.path.join(self.dir, rel)
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ----- queries -----
+    def has_month(self, month):
+        month = str(month)
+        return month in self.segments() or month in self.base_months()
+
+    def months(self):
+        return sorted(self.base_months() | set(self.segments()))
+
+    # ----- writes -----
+    def append(self, month, rows):
+        """
+        Store `rows` (the month's fuel row) unless the month exists already.
+        Returns False for an already-stored month (idempotent re-runs).
+        """
+        month = str(month)
+        if self.has_month(month):
+            return False
+
+        rows = apply_schema(DATASET, rows)
+        seg_dir = os.path.join(self.dir, "segments")
+        os.makedirs(seg_dir, exist_ok=True)
+
+        rel = os.path.join("segments", f"{month}.parquet")
+        path = os.path.join(self.dir, rel)
+        tmp = f"{path}.tmp"
+        rows.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+        self._save_segments({**self.segments(), month: rel})
+        return True
+
+    def _rewrite_base(self, frame):
+        """Write `frame` as the new base and fold every segment into it."""
+        segments = self.segments()
+        frame = frame.sort_values("month").reset_index(drop=True)
+        write_dataset(DATASET, frame, self.base)
+        months = set(frame["month"].astype(str))
+        _write_json_atomic(self.base_index_path, {"stamp": self._base_stamp(), "months": sorted(months)})
+        self._base = None
+        self._save_segments({})
+        self._remove_segment_files(segments)
+
+    def compact(self):
+        """Fold appended segments into the base file; returns months folded."""
+        segments = self.segments()
+        if not segments:
+            return 0
+
+        self._rewrite_base(self.read())
+        print(f"[OK] Compacted {len(segments)} appended month(s) into {self.base_path}")
+        return len(segments)
+
+    def extend(self, rows):
+        """
+        Bulk append (one row per month): months not stored yet are written
+        together with the existing history in a single base rewrite,
+        instead of one segment each. Returns the months added.
+        """
+        rows = apply_schema(DATASET, rows)
+        rows = rows[~rows["month"].astype(str).isin(self.months())]
+        if rows.empty:
+            return []
+
+        history = self.read() if self.months() else None
+        frame = rows if history is None else pd.concat([history, rows], ignore_index=True)
+        self._rewrite_base(frame)
+        return rows["month"].astype(str).tolist()
+
+    # ----- read -----
+    def fingerprint(self):
+        """
+        {"base": [size, mtime] of the base, "segments": {month: sha256}}
+        without parsing anything; changes whenever a stored month does.
+        """
+        segments = {
+            month: _file_digest(os.path.join(self.dir, rel))
+            for month, rel in sorted(self.segments().items())
+        }
+        return {"base": self._base_stamp(), "segments": segments}
+
+    def read(self, since=None):
+        """
+        Base + appended months as one schema-typed frame, sorted by month.
+        With `since` (a month), only months >= since: the base is then
+        read filtered, and only if it holds such a month.
+        """
+        self.base_months()  # drops segments the base already holds
+        since = None if since is None else pd.Period(since, freq="M")
+        first = None if since is None else str(since)
+        frames = []
+
+        if os.path.exists(self.base_path):
+            if since is None:
+                frames.append(apply_schema(DATASET, pd.read_parquet(self.base_path)))
+            elif max(self.base_months(), default="") >= first:
+                # month is stored as a Period ordinal, so filter on date
+                rows = pd.read_parquet(self.base_path, filters=[("date", ">=", since.start_time)])
+                frames.append(apply_schema(DATASET, rows))
+        for month, rel in self.segments().items():
+            if since is None or month >= first:
+                frames.append(apply_schema(DATASET, pd.read_parquet(os.path.join(self.dir, rel))))
+
+        if not frames:
+            raise FileNotFoundError(
+                f"No fuel history in {self.base} (CSV only? run python -m pipeline.data_store migrate)"
+                if since is None else f"No fuel history from {since} in {self.base}"
+            )
+
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values("month").reset_index(drop=True)
+
+
+# --------------------------------------------------------
+# ISIBENS table → one monthly fuel row
+# --------------------------------------------------------
+def clean_val(v):
+    """Convert invalid numbers (0, NaN, '-', empty) to None."""
+    if pd.isna(v):
+        return None
+    s = str(v).strip()
+    if s == "" or s == "-" or s == "0":
+        return None
+    try:
+        num = float(s)
+        if num == 0:
+            return None
+        return num
+    except ValueError:
+        return None
+
+
+def monthly_row(df_clean, date):
+    """One-row fuel frame for `date` from a parsed ISIBENS table."""
+    row = {"date": date, **{col: None for col in TARGET_COLS}}
+    for _, r in df_clean.iterrows():
+        if pd.isna(r["ron"]):
+            continue
+        ron = str(int(float(r["ron"])))
+        if ron not in COLUMN_MAP:
+            print(f"[WARN] Unsupported RON {ron}")
+            continue
+        for provider_src, col_hist in COLUMN_MAP[ron].items():
+            row[col_hist] = clean_val(r.get(provider_src))
+
+    return apply_schema(DATASET, pd.DataFrame([row]))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "compact":
+        MonthStore().compact()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "months":
+        print("\n".join(MonthStore().months()))
+    else:
+        print("usage: python -m pipeline.history_store compact | months")
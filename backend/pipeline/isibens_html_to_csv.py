@@ -1,41 +1,150 @@
 import os
-import re
+from html.parser import HTMLParser
+
 import pandas as pd
-from bs4 import BeautifulSoup
 
+COLUMNS = ["ron", "pertamina", "vivo", "bp", "shell"]
+PRICE_COLS = COLUMNS[1:]
+
+# First number in a cell ("12.350Pertamax" → "12.350"); "." / "," are
+# thousands separators
+PRICE_PATTERN = r"([0-9]+[.,]?[0-9]*)"
+
+# Characters fed to the parser at a time; parsing stops after the first table
+CHUNK_SIZE = 16 * 1024
 
-def extract_number(cell_text: str):
+
+# --------------------------------------------------------
+# Streaming first-table reader
+# --------------------------------------------------------
+class FirstTableParser(HTMLParser):
+    """
+    Collects the cell texts of the first <table> as rows of strings and
+    sets `done` at its closing tag. Cell text matches BeautifulSoup's
+    get_text(strip=True): every text node stripped, empty ones dropped,
+    the rest joined; comments are skipped.
     """
-    Extract numeric price from messy strings such as:
 
-    - "12.350Pertamax"
-    - "13.190BP ultimate"
-    - "13.480V-Power Nitro+"
-    - "-"
-    - "0Revvo92"
-    - "Price: 12.500 IDR"
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.found = False
+        self.done = False
+        self._depth = 0
+        self._row = None
+        self._cell = None
+        self._text = []
+
+    def _flush_text(self):
+        if self._cell is not None and self._text:
+            text = "".join(self._text).strip()
+            if text:
+                self._cell.append(text)
+        self._text = []
+
+    def _close_cell(self):
+        self._flush_text()
+        if self._cell is not None and self._row is not None:
+            self._row.append("".join(self._cell))
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None:
+            self.rows.append(self._row)
+        self._row = None
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if self.done:
+            return
+        if tag == "table":
+            self.found = True
+            self._depth += 1
+        elif self._depth == 0:
+            return
+        elif tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag in ("td", "th"):
+            self._close_cell()
+            if self._row is None:
+                self._row = []
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if self.done or self._depth == 0:
+            return
+        if tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "table":
+            self._depth -= 1
+            if self._depth == 0:
+                self._close_row()
+                self.done = True
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._text.append(data)
+
+
+def read_first_table(html_path, chunk_size=CHUNK_SIZE):
+    """Rows (lists of cell strings) of the first table; stops reading after it."""
+    parser = FirstTableParser()
+    with open(html_path, "r", encoding="utf-8", errors="ignore") as f:
+        while not parser.done:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+
+    if not parser.found:
+        raise ValueError("No tables found in the HTML file.")
+    if not parser.done:
+        parser.close()
+        parser._close_row()
+    return parser.rows
+
 
-    Returns integer price in IDR or None.
+# --------------------------------------------------------
+# Vectorized cleaning
+# --------------------------------------------------------
+def extract_prices(col):
     """
+    Integer IDR price per cell: the first number in the cell with its
+    "." / "," separators dropped ("12.350Pertamax" → 12350, "0Revvo92" →
+    0). NaN when the cell has no number ("-", "", "na").
+    """
+    num = col.str.extract(PRICE_PATTERN, expand=False).str.replace(r"[.,]", "", regex=True)
+    return pd.to_numeric(num)
+
 
-    if not isinstance(cell_text, str):
-        return None
+def parse_ron(col):
+    return pd.to_numeric(col.where(col.str.fullmatch(r"[0-9]+")))
 
-    text = cell_text.strip()
-    if text == "" or text == "-" or text.lower() == "na":
-        return None
 
-    # Find ANY numeric pattern (first occurrence)
-    match = re.search(r"([0-9]+[.,]?[0-9]*)", text)
-    if not match:
-        return None
+def table_frame(rows):
+    """Raw first-table rows → (raw, clean) frames with the 5 ISIBENS columns."""
+    # First row is header; body rows padded / cut to 5 cells
+    body = [(r + [""] * 5)[:5] for r in rows[1:]]
+    raw = pd.DataFrame(body, columns=COLUMNS, dtype="str")
 
-    num = match.group(1)
+    df = raw.copy()
+    for col in PRICE_COLS:
+        df[col] = extract_prices(raw[col])
+    df["ron"] = parse_ron(raw["ron"])
+    return raw, df
 
-    # Remove separators (12.350 → 12350)
-    num = num.replace(".", "").replace(",", "")
 
-    return int(num) if num.isdigit() else None
+def parse_isibens_table(html_path):
+    """ISIBENS page → cleaned frame (ron, pertamina, vivo, bp, shell)."""
+    return table_frame(read_first_table(html_path))[1]
 
 
 def isibens_html_to_csv(html_path: str, output_csv: str):
@@ -44,71 +153,36 @@ def isibens_html_to_csv(html_path: str, output_csv: str):
     if not os.path.exists(html_path):
         raise FileNotFoundError(f"HTML file not found: {html_path}")
 
-    with open(html_path, "r", encoding="utf-8", errors="ignore") as f:
-        html = f.read()
-
     print("\n==============================")
-    print("STEP 1 — File Loaded Successfully")
+    print("STEP 1 — Reading First Table")
     print("==============================")
 
-    soup = BeautifulSoup(html, "html.parser")
-
-    tables = soup.find_all("table")
-    print(f"[INFO] Found {len(tables)} tables")
-
-    if len(tables) < 1:
-        raise ValueError("No tables found in the HTML file.")
-
-    tbl = tables[0]
+    rows = read_first_table(html_path)
 
     print("\n==============================")
     print("STEP 2 — Extracting Rows")
     print("==============================")
-
-    rows = tbl.find_all("tr")
     print(f"[INFO] Total rows including header: {len(rows)}")
 
-    data_rows = []
-    for i, row in enumerate(rows):
-        cells = row.find_all(["td", "th"])
-        values = [c.get_text(strip=True) for c in cells]
+    for i, values in enumerate(rows):
         print(f"\nROW {i}: {values}")
-        data_rows.append(values)
 
     print("\n==============================")
     print("STEP 3 — Parsing Table Structure")
     print("==============================")
 
-    header = data_rows[0]
-    print(f"[HEADER RAW]: {header}")
+    print(f"[HEADER RAW]: {rows[0] if rows else []}")
 
     # Always enforce 5 correct headers
-    columns = ["ron", "pertamina", "vivo", "bp", "shell"]
-    print(f"[HEADER CLEANED]: {columns}")
+    print(f"[HEADER CLEANED]: {COLUMNS}")
 
-    # Body rows
-    body = data_rows[1:]
-
-    # Normalize row width (pad or cut)
-    fixed_body = []
-    for row in body:
-        row = (row + [""] * 5)[:5]
-        fixed_body.append(row)
-
-    df = pd.DataFrame(fixed_body, columns=columns)
+    raw, df = table_frame(rows)
 
     print("\n==============================")
     print("STEP 4 — RAW DATAFRAME BEFORE CLEANING")
-    print(df)
+    print(raw)
     print("==============================\n")
 
-    # Apply extractor to price columns
-    for col in ["pertamina", "vivo", "bp", "shell"]:
-        df[col] = df[col].apply(extract_number)
-
-    # Convert RON column
-    df["ron"] = df["ron"].apply(lambda x: int(x) if str(x).isdigit() else None)
-
     print("==============================")
     print("STEP 5 — CLEANED DATAFRAME")
     print(df)
@@ -1,42 +1,148 @@
 # pipeline/merge_dataset.py
+#
+# fuel ⋈ exog on month → merged dataset.
+#
+# Incremental by default. A state file next to the merged dataset records
+# the watermark (last merged month), the fuel store fingerprint (base
+# stamp + one digest per appended month segment), a digest of the exog
+# rows before the re-merge window and a digest of the merged file.
+#
+#   nothing changed   → no-op: nothing is parsed or written
+#   new fuel months,  → only months from the window start (watermark -
+#   exog revised        REMERGE_MONTHS) on are merged: new fuel months
+#   inside the window   from their segments, exog rows from the window,
+#                       fuel rows of already merged months from the merged
+#                       file. The result replaces the window in the merged
+#                       rows, written to a temp file and renamed
+#   anything else     → full rebuild: fuel base rewritten, an appended
+#                       month revised or added before the window, exog
+#                       revised before it, or no usable state
 
+import hashlib
+import json
+import os
+import sys
 import pandas as pd
 
-FUEL_PATH = "data/processed/fuel_price_indonesia_clean.csv"
-EXOG_PATH = "data/processed/exog_history.csv"
-OUT_PATH = "data/processed/merged_dataset.csv"
+from pipeline import data_store
+from pipeline.data_store import dataset_path, read_dataset, write_dataset
+from pipeline.history_store import MonthStore
 
+# Watched by the API's history cache (api/history.py)
+RELOAD_MARKER = ".history_reload"
 
-def merge_monthly_dataset():
-    print("\n=========== MERGE DATASET (Fuel + Exogs) ===========")
+# Months before the watermark that are re-merged every run: exog_loader
+# re-fetches OVERLAP_MONTHS (1) before its last stored month, so those may
+# have been revised
+REMERGE_MONTHS = 1
 
-    # Load fuel dataset
-    print("[INFO] Loading fuel price dataset…")
-    fuel = pd.read_csv(FUEL_PATH)
+STATE_VERSION = 3
 
-    # Ensure 'date'
-    if "date" not in fuel.columns:
-        print("[FIX] Fuel missing 'date'. Rebuilding from 'month'…")
-        if "month" in fuel.columns:
-            fuel["date"] = fuel["month"].astype(str) + "-01"
-        else:
-            raise ValueError("Fuel dataset must contain either 'date' or 'month'.")
 
-    # Ensure 'month'
-    if "month" not in fuel.columns:
-        fuel["month"] = fuel["date"].str[:7]
+def reload_marker_path():
+    return os.path.join(data_store.PROCESSED_DIR, RELOAD_MARKER)
 
-    # Load EXOG dataset
-    print("[INFO] Loading EXOG history…")
-    exog = pd.read_csv(EXOG_PATH)
 
-    if "month" not in exog.columns:
-        raise ValueError("EXOG history missing 'month'")
+def signal_history_reload():
+    """Touch the reload marker so a running API reloads the merged dataset."""
+    path = reload_marker_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a"):
+        os.utime(path, None)
+
+
+# --------------------------------------------------------
+# Merge state (watermark + source fingerprints)
+# --------------------------------------------------------
+def state_path():
+    return dataset_path("merged", "state.json")
+
+
+def load_state():
+    path = state_path()
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    path = state_path()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def frame_digest(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def window_start(watermark):
+    """First month of the re-merge window."""
+    return pd.Period(watermark, freq="M") - REMERGE_MONTHS
+
+
+def exog_path():
+    return next(
+        (p for p in (dataset_path("exog", fmt) for fmt in ("parquet", "csv")) if os.path.exists(p)),
+        None,
+    )
+
+
+def is_up_to_date(state, fuel_print, exog_sha):
+    if state is None or state.get("version") != STATE_VERSION:
+        return False
+    if state["fuel"] != fuel_print or state["exog_sha256"] != exog_sha:
+        return False
+
+    merged_path = dataset_path("merged")
+    return os.path.exists(merged_path) and file_digest(merged_path) == state["merged_sha256"]
+
+
+def rebuild_reason(state, fuel_print, exog):
+    """Why the merged dataset must be rebuilt in full (None if the window suffices)."""
+    if state is None or state.get("version") != STATE_VERSION or state["watermark"] is None:
+        return "no merge state"
+
+    merged_path = dataset_path("merged")
+    if not os.path.exists(merged_path):
+        return "merged dataset missing"
+    if file_digest(merged_path) != state["merged_sha256"]:
+        return "merged dataset changed outside the pipeline"
+
+    start = window_start(state["watermark"])
+    old = state["fuel"]
+    if fuel_print["base"] != old["base"]:
+        return "fuel base rewritten"
 
-    exog["month"] = exog["month"].astype(str)
+    segments = fuel_print["segments"]
+    # appended months are never rewritten by the store; a changed one was
+    # edited by hand, and its merged row may be anywhere
+    revised = sorted(m for m, h in old["segments"].items() if segments.get(m) != h)
+    if revised:
+        return f"fuel months revised: {revised}"
+    early = sorted(m for m in segments if m not in old["segments"] and m < str(start))
+    if early:
+        return f"fuel months added before {start}: {early}"
 
-    # Merge
-    print("[INFO] Merging on 'month'…")
+    if list(exog.columns) != state["exog_columns"]:
+        return "exog columns changed"
+    if frame_digest(exog[exog["month"] < start]) != state["exog_head"]:
+        return f"exog revised before {start}"
+
+    return None
+
+
+# --------------------------------------------------------
+# Merge
+# --------------------------------------------------------
+def merge_frames(fuel, exog):
     merged = pd.merge(fuel, exog, on="month", how="inner")
 
     # ---------------------------------------------------
@@ -51,7 +157,7 @@ def merge_monthly_dataset():
         # Keep the main one called "date"
         if "date" not in merged.columns:
             # If not exist, create one from exog
-            merged["date"] = merged["month"].astype(str) + "-01"
+            merged["date"] = merged["month"].dt.to_timestamp()
 
         # Drop date_x and date_y
         for dc in date_cols:
@@ -62,11 +168,93 @@ def merge_monthly_dataset():
     merged["date"] = pd.to_datetime(merged["date"])
 
     # Sort
-    merged = merged.sort_values("date").reset_index(drop=True)
+    return merged.sort_values("date").reset_index(drop=True)
+
+
+def window_fuel(store, merged, start, columns):
+    """
+    Fuel rows for months >= start. Months already merged are taken from
+    the merged rows (fuel values are never revised inside the window, see
+    rebuild_reason); only the others are read from the store.
+    """
+    known = merged.loc[merged["month"] >= start, [c for c in columns if c != "date"]]
+    known = known.assign(date=known["month"].dt.to_timestamp())[columns]
+
+    first = str(start)
+    merged_months = set(known["month"].astype(str))
+    window = {m for m in store.base_months() if m >= first} | {m for m in store.segments() if m >= first}
+    missing = sorted(window - merged_months)
+    if not missing:
+        return known
+
+    rows = store.read(since=missing[0])
+    rows = rows[rows["month"].astype(str).isin(missing)]
+    return pd.concat([known, rows], ignore_index=True).sort_values("month").reset_index(drop=True)
+
+
+def merge_monthly_dataset(full=False):
+    print("\n=========== MERGE DATASET (Fuel + Exogs) ===========")
+
+    store = MonthStore()
+    fuel_print = store.fingerprint()
+    exog_sha = file_digest(exog_path()) if exog_path() else None
+    state = load_state()
+
+    if not full and is_up_to_date(state, fuel_print, exog_sha):
+        print(f"[OK] Merged dataset up to date (watermark {state['watermark']})")
+        return read_dataset("merged")
+
+    # Load EXOG dataset
+    print("[INFO] Loading EXOG history…")
+    exog = read_dataset("exog")
+
+    if "month" not in exog.columns:
+        raise ValueError("EXOG history missing 'month'")
+
+    reason = "requested" if full else rebuild_reason(state, fuel_print, exog)
+
+    if reason:
+        print(f"[INFO] Full merge ({reason})…")
+
+        # Load fuel dataset (compacted base + appended months)
+        print("[INFO] Loading fuel price dataset…")
+        fuel = store.read()
+
+        # month / date are derived from each other by the store schema
+        if "month" not in fuel.columns:
+            raise ValueError("Fuel dataset must contain either 'date' or 'month'.")
+
+        merged = merge_frames(fuel, exog)
+        fuel_columns = list(fuel.columns)
+    else:
+        start = window_start(state["watermark"])
+        print(f"[INFO] Incremental merge from {start} (watermark {state['watermark']})…")
+        merged = read_dataset("merged")
+        fuel = window_fuel(store, merged, start, state["fuel_columns"])
+        fresh = merge_frames(fuel, exog[exog["month"] >= start])
+
+        # older merged rows are kept as they are
+        merged = pd.concat([merged[merged["month"] < start], fresh], ignore_index=True)
+        merged = merged.sort_values("date").reset_index(drop=True)
+        fuel_columns = state["fuel_columns"]
+
+    watermark = str(merged["month"].max()) if len(merged) else None
 
-    # Save
-    merged.to_csv(OUT_PATH, index=False)
-    print(f"[OK] Merged dataset created → {OUT_PATH}")
+    # Save: dataset first (temp + rename), then the state describing it; a
+    # crash in between leaves a digest mismatch → full rebuild next run
+    out_path = write_dataset("merged", merged)
+    save_state({
+        "version": STATE_VERSION,
+        "watermark": watermark,
+        "fuel": fuel_print,
+        "fuel_columns": fuel_columns,
+        "exog_sha256": exog_sha,
+        "exog_columns": list(exog.columns),
+        "exog_head": frame_digest(exog[exog["month"] < window_start(watermark)]) if watermark else None,
+        "merged_sha256": file_digest(out_path),
+    })
+    signal_history_reload()
+    print(f"[OK] Merged dataset written → {out_path}")
     print(f"[INFO] Final columns: {merged.columns.tolist()}")
     print(f"[INFO] Total rows: {len(merged)}")
 
@@ -74,4 +262,4 @@ def merge_monthly_dataset():
 
 
 if __name__ == "__main__":
-    merge_monthly_dataset()
\ No newline at end of file
+    merge_monthly_dataset(full="--full" in sys.argv)
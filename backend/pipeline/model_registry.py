@@ -1,42 +1,343 @@
+# pipeline/model_registry.py
+#
+# Single source of truth for trained models.
+#
+# Training writes models/<target>/{model.pkl,meta.json} (multi-output mode:
+# meta.json points at a shared models/_multi/group_NN/model.pkl). The
+# registry packs every selected model + its metadata into one versioned
+# bundle file, models/bundle.joblib, which serving code loads once.
+
 from pathlib import Path
+import hashlib
 import json
+import os
+import threading
+import time
+import warnings
+
 import joblib
+import numpy as np
+import pandas as pd
+
+from pipeline.tree_compiler import check_parity, compile_model
 
 MODELS_DIR = Path("models")
-METRICS_DIR = Path("metrics")
+BUNDLE_NAME = "bundle.joblib"
+BUNDLE_FORMAT = 2
+
+# Serve through the compiled NumPy tree engine when available (set 0 to
+# force native sklearn/xgboost predict). The compiled walk has no per-call
+# overhead but scales worse than the native C loops, so large batches
+# (stress-test scenarios) stay native.
+USE_COMPILED = os.getenv("COMPILED_TREES", "1") != "0"
+COMPILED_MAX_ROWS = int(os.getenv("COMPILED_MAX_ROWS", "128"))
+
+# The compiled engine compares float32 inputs like the native models, but
+# sklearn rejects values beyond the float32 range while a cast would turn
+# them into ±inf; such frames go to the native models so both agree.
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+TARGET_COLS = [
+    "pertamina_90","pertamina_92","pertamina_95","pertamina_98",
+    "shell_92","shell_95","shell_98",
+    "bp_92","bp_95",
+    "vivo_90","vivo_92","vivo_95",
+]
+
+
+# --------------------------------------------------------
+# Bundle object
+# --------------------------------------------------------
+class ModelBundle:
+    """
+    All selected target models in memory.
+
+    targets  {target: {"model_key", "output", "features", "mae", "model_name"}}
+    models   {model_key: fitted estimator}; a shared multi-output model
+             appears once and is evaluated once per predict() call.
+    compiled {model_key: CompiledEnsemble} packed-array copies of the models
+             (pipeline/tree_compiler.py), used instead of the native
+             predict for small frames when present.
+    """
+
+    def __init__(self, version, targets, models, created_at=None, compiled=None):
+        self.version = version
+        self.targets = targets
+        self.models = models
+        self.created_at = created_at
+        self.compiled = compiled or {}
+        self.use_compiled = USE_COMPILED
+        self._plan = None
+
+    def __contains__(self, target):
+        return target in self.targets
+
+    def meta(self, target):
+        return self.targets[target]
+
+    def _layout(self):
+        """
+        Column plan shared by every predict() call: the union of all model
+        features (one matrix per call) and, per model, the integer indices
+        of its own features in that matrix.
+        """
+        if self._plan is None:
+            columns = []
+            position = {}
+            groups = {}
+            for target, meta in self.targets.items():
+                groups.setdefault(meta["model_key"], []).append(target)
+                for f in meta["features"]:
+                    if f not in position:
+                        position[f] = len(columns)
+                        columns.append(f)
 
-BEST_MODELS_FILE = METRICS_DIR / "best_models.json"
+            plan = []
+            for key, targets in groups.items():
+                features = self.targets[targets[0]]["features"]
+                idx = np.array([position[f] for f in features], dtype=np.intp)
+                outputs = [(t, self.targets[t]["output"]) for t in targets]
+                plan.append((key, features, idx, outputs))
 
+            self._plan = (columns, plan)
+        return self._plan
 
-def load_best_models():
-    with open(BEST_MODELS_FILE, "r") as f:
-        return json.load(f)
+    def predict(self, frame, independent=False):
+        """
+        Predict every target for every row of `frame`.
+        Missing feature values are filled the way predict.py always has
+        (ffill → bfill → 0), which treats the rows as a time series. With
+        independent=True (batch scenarios) every row stands alone and gaps
+        are filled with 0 per row, so one scenario never leaks into its
+        neighbours. Returns {target: np.ndarray of len(frame)}.
+        """
+        columns, plan = self._layout()
+        X = frame.reindex(columns=columns).to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        X = _fill_rows(X) if independent else _fill_series(X)
+        n = len(X)
+        compiled_ok = self.use_compiled and n <= COMPILED_MAX_ROWS and not (
+            np.abs(X) > FLOAT32_MAX).any()
 
+        out = {}
+        for key, features, idx, outputs in plan:
+            engine = self.compiled.get(key) if compiled_ok else None
+            if engine is not None:
+                preds = engine.predict(X[:, idx]).reshape(n, -1)
+            else:
+                # native models were fitted on DataFrames and check the names
+                Xm = pd.DataFrame(X[:, idx], columns=features, index=frame.index)
+                preds = np.asarray(self.models[key].predict(Xm)).reshape(n, -1)
+            for target, output in outputs:
+                out[target] = preds[:, output]
 
-def load_all_models():
-    best = load_best_models()
-    loaded = {}
+        return {t: out[t] for t in self.targets}
 
-    for target, model_type in best.items():
-        model_path = MODELS_DIR / f"{target}_{model_type}.pkl"
-        meta_path = MODELS_DIR / f"{target}_{model_type}_meta.json"
 
-        # Load main model
-        model = joblib.load(model_path)
+def _fill_rows(X):
+    """Gaps → 0, row by row (DataFrame.fillna(0))."""
+    X[np.isnan(X)] = 0.0
+    return X
 
-        # Load metadata (feature order)
-        if meta_path.exists():
-            with open(meta_path, "r") as f:
-                metadata = json.load(f)
-            features = metadata.get("features", None)
+
+def _fill_series(X):
+    """Per column ffill → bfill → 0, on the whole matrix at once."""
+    missing = np.isnan(X)
+    if not missing.any():
+        return X
+
+    rows = np.arange(len(X))[:, None]
+    cols = np.arange(X.shape[1])
+
+    # forward: index of the last non-missing row at or above each cell
+    last = np.maximum.accumulate(np.where(missing, 0, rows), axis=0)
+    X = X[last, cols]
+    # backward: first non-missing row at or below, for the leading gaps
+    missing = np.isnan(X)
+    first = np.minimum.accumulate(np.where(missing, len(X) - 1, rows)[::-1], axis=0)[::-1]
+    X = X[first, cols]
+
+    X[np.isnan(X)] = 0.0
+    return X
+
+
+# --------------------------------------------------------
+# Build from the per-target layout
+# --------------------------------------------------------
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def collect_models(models_dir=None):
+    """Read models/<target>/meta.json and resolve each target's model file."""
+    models_dir = Path(models_dir or MODELS_DIR)
+    targets = {}
+
+    for target in TARGET_COLS:
+        meta_path = models_dir / target / "meta.json"
+        if not meta_path.exists():
+            continue
+
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+
+        if "shared" in meta:
+            model_key = meta["shared"]
+            model_path = models_dir / meta["shared"] / "model.pkl"
         else:
-            features = None
+            model_key = target
+            model_path = models_dir / target / "model.pkl"
+
+        if not model_path.exists():
+            print(f"[WARN] Missing model for {target}, skipping...")
+            continue
 
-        # Store in dict (NOT tuple)
-        loaded[target] = {
-            "model_type": model_type,
-            "model": model,
-            "features": features,
+        targets[target] = {
+            "model_key": model_key,
+            "model_path": model_path,
+            "output": meta.get("output", 0),
+            "features": meta["features"],
+            "mae": meta["mae"],
+            "model_name": meta.get("model_name"),
         }
 
-    return loaded
\ No newline at end of file
+    return targets
+
+
+def compile_checked(key, model, n_check=256):
+    """
+    Compile a model and verify it against native predict on inputs spread
+    over the model's own split thresholds. Returns None (native fallback)
+    if the model type is unsupported or parity fails.
+    """
+    try:
+        compiled = compile_model(model)
+
+        rng = np.random.default_rng(0)
+        n_features = int(compiled.feature.max()) + 1
+        n_features = max(n_features, getattr(model, "n_features_in_", n_features))
+        X = np.empty((n_check, n_features))
+        for f in range(n_features):
+            thr = compiled.threshold[(compiled.feature == f) & (compiled.left >= 0)]
+            lo, hi = (thr.min(), thr.max()) if len(thr) else (0.0, 1.0)
+            pad = (hi - lo) * 0.1 + 1e-9
+            X[:, f] = rng.uniform(lo - pad, hi + pad, n_check)
+
+        with warnings.catch_warnings():
+            # models were fitted on DataFrames; feature names don't matter here
+            warnings.simplefilter("ignore", UserWarning)
+            check_parity(model, compiled, X)
+        return compiled
+
+    except Exception as e:
+        print(f"[WARN] Not compiling {key}, serving with native predict: {e}")
+        return None
+
+
+def build_bundle(models_dir=None, out_path=None):
+    """
+    Pack every selected model into models/bundle.joblib (uncompressed, so it
+    can be memory-mapped), together with a compiled packed-array copy of
+    each. The version is a content hash of the packed metadata and model
+    files.
+    """
+    models_dir = Path(models_dir or MODELS_DIR)
+    out_path = Path(out_path or models_dir / BUNDLE_NAME)
+
+    collected = collect_models(models_dir)
+    if not collected:
+        raise FileNotFoundError(f"No trained models found in {models_dir}")
+
+    h = hashlib.sha256()
+    models = {}
+    targets = {}
+    for target, info in collected.items():
+        key = info["model_key"]
+        if key not in models:
+            models[key] = joblib.load(info["model_path"])
+            h.update(key.encode())
+            h.update(_file_digest(info["model_path"]).encode())
+
+        targets[target] = {k: v for k, v in info.items() if k != "model_path"}
+
+    compiled = {}
+    for key, model in models.items():
+        engine = compile_checked(key, model)
+        if engine is not None:
+            compiled[key] = engine
+
+    h.update(json.dumps(targets, sort_keys=True).encode())
+    version = f"v{BUNDLE_FORMAT}-{h.hexdigest()[:12]}"
+
+    payload = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "targets": targets,
+        "models": models,
+        "compiled": compiled,
+    }
+
+    tmp = out_path.with_suffix(".tmp")
+    joblib.dump(payload, tmp)
+    tmp.replace(out_path)
+
+    print(f"[OK] Model bundle {version} → {out_path} "
+          f"({len(targets)} targets, {len(models)} models, {len(compiled)} compiled)")
+    return out_path
+
+
+# --------------------------------------------------------
+# Load once per process
+# --------------------------------------------------------
+def load_bundle(path=None, mmap=True):
+    path = Path(path or MODELS_DIR / BUNDLE_NAME)
+    payload = joblib.load(path, mmap_mode="r" if mmap else None)
+
+    if payload.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format in {path}: {payload.get('format')}")
+
+    return ModelBundle(
+        payload["version"], payload["targets"], payload["models"],
+        payload.get("created_at"), payload.get("compiled"),
+    )
+
+
+_bundle = None
+_bundle_key = None
+_lock = threading.Lock()
+
+
+def get_bundle(models_dir=None, mmap=True):
+    """
+    Process-wide bundle. Builds models/bundle.joblib from the per-target
+    layout if it does not exist yet (or was written by an older bundle
+    format); reloads when the file is replaced.
+    """
+    global _bundle, _bundle_key
+
+    models_dir = Path(models_dir or MODELS_DIR)
+    path = models_dir / BUNDLE_NAME
+
+    with _lock:
+        if not path.exists():
+            build_bundle(models_dir, path)
+
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        if _bundle is None or _bundle_key != key:
+            try:
+                _bundle = load_bundle(path, mmap=mmap)
+            except ValueError as e:
+                print(f"[WARN] {e} — rebuilding")
+                build_bundle(models_dir, path)
+                _bundle = load_bundle(path, mmap=mmap)
+                st = path.stat()
+                key = (str(path), st.st_mtime_ns, st.st_size)
+            _bundle_key = key
+            print(f"[INFO] Loaded model bundle {_bundle.version} ({len(_bundle.targets)} targets)")
+
+        return _bundle
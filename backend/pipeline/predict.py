@@ -1,12 +1,12 @@
 # pipeline/predict.py
 
+import numpy as np
 import pandas as pd
-import joblib
 import json
-import os
 
-MERGED_PATH = "data/processed/merged_dataset.csv"
-EXOG_PATH = "data/processed/exog_history.csv"
+from pipeline.data_store import read_dataset
+from pipeline.model_registry import get_bundle
+
 MODEL_DIR = "models"
 
 TARGET_COLS = [
@@ -21,12 +21,12 @@ TARGET_COLS = [
 # LOAD LATEST EXOG ROW
 # --------------------------------------------------------
 def load_latest_exogs():
-    ex = pd.read_csv(EXOG_PATH)
+    ex = read_dataset("exog")
     ex = ex.sort_values("month")
     last = ex.iloc[-1].to_dict()
 
     # month is needed for return value
-    next_month = last["month"]
+    next_month = str(last["month"])
 
     # Exclude month from feature inputs
     cleaned = {k: last[k] for k in last if k != "month"}
@@ -35,43 +35,24 @@ def load_latest_exogs():
 
 
 # --------------------------------------------------------
-# MAIN PREDICT FUNCTION
+# CONFIDENCE + PRICE FLOOR RULES (shared with api/predict.py)
 # --------------------------------------------------------
-def predict_next_month():
-
-    # Load merged data (just for sanity check or future use)
-    merged = pd.read_csv(MERGED_PATH).sort_values("month")
-
-    # Load latest exog row + predicted target month
-    next_month, latest_exogs = load_latest_exogs()
+RONS = ["90", "92", "95", "98"]
+FLOOR_BRANDS = ["vivo", "bp", "shell"]
 
-    # Build a dataframe for model prediction
-    next_exog_df = pd.DataFrame([latest_exogs])
 
+def score_predictions(bundle, yhats, row=0):
+    """Turn raw bundle outputs for one row into {target: {price, confidence_pct}}."""
     predictions = {}
 
     for col in TARGET_COLS:
 
-        model_dir = os.path.join(MODEL_DIR, col)
-        model_path = os.path.join(model_dir, "model.pkl")
-        meta_path = os.path.join(model_dir, "meta.json")
-
-        if not os.path.exists(model_path) or not os.path.exists(meta_path):
+        if col not in bundle:
             print(f"[WARN] Missing model for {col}, skipping...")
             continue
 
-        # Load model + metadata
-        model = joblib.load(model_path)
-        meta = json.load(open(meta_path))
-
-        mae = meta["mae"]
-        feature_cols = meta["features"]
-
-        # Build X_pred
-        X_pred = next_exog_df.reindex(columns=feature_cols)
-        X_pred = X_pred.ffill().bfill().fillna(0)
-
-        yhat = float(model.predict(X_pred)[0])
+        mae = bundle.meta(col)["mae"]
+        yhat = float(yhats[col][row])
 
         # Simple confidence
         confidence = max(0.0, 1 - (mae / max(abs(yhat), 1)))
@@ -82,26 +63,93 @@ def predict_next_month():
             "confidence_pct": confidence_pct
         }
 
-    # --------------------------------------------------------
-    # PRICE FLOOR RULES:
-    # vivo, bp, shell cannot go lower than Pertamina (same RON)
-    # --------------------------------------------------------
-    def enforce_floor(ron):
-        pert = f"pertamina_{ron}"
-        if pert not in predictions:
-            return
+    return predictions
+
+
+def enforce_floor(predictions, ron):
+    """vivo, bp, shell cannot go lower than Pertamina (same RON)."""
+    pert = f"pertamina_{ron}"
+    if pert not in predictions:
+        return
+
+    base_price = predictions[pert]["price"]
 
-        base_price = predictions[pert]["price"]
+    for brand in FLOOR_BRANDS:
+        key = f"{brand}_{ron}"
+        if key in predictions and predictions[key]["price"] < base_price:
+            predictions[key]["price"] = base_price
 
-        for brand in ["vivo", "bp", "shell"]:
+
+def apply_price_floors(predictions):
+    for ron in RONS:
+        enforce_floor(predictions, ron)
+    return predictions
+
+
+# --------------------------------------------------------
+# BATCH (SCENARIO) PREDICTION — columnar, vectorized
+# --------------------------------------------------------
+def apply_price_floors_batch(prices):
+    """enforce_floor across all rows at once: {target: ndarray} in place."""
+    for ron in RONS:
+        pert = f"pertamina_{ron}"
+        if pert not in prices:
+            continue
+        for brand in FLOOR_BRANDS:
             key = f"{brand}_{ron}"
-            if key in predictions and predictions[key]["price"] < base_price:
-                predictions[key]["price"] = base_price
+            if key in prices:
+                prices[key] = np.maximum(prices[key], prices[pert])
+    return prices
+
+
+def predict_batch(bundle, frame):
+    """
+    Predict N scenarios in one pass: each target model runs once over all
+    rows of `frame` (N × features). Returns columnar arrays:
+    {"price": {target: ndarray}, "confidence_pct": {target: ndarray}}
+    with the same confidence formula and floor rules as predict_next_month.
+    Rows are independent scenarios, so gaps are never filled across rows.
+    """
+    yhats = bundle.predict(frame, independent=True)
+
+    prices = {}
+    confidence = {}
+    for col in TARGET_COLS:
+        if col not in bundle:
+            continue
+
+        yhat = np.asarray(yhats[col], dtype=float)
+        mae = bundle.meta(col)["mae"]
+
+        conf = np.maximum(0.0, 1 - mae / np.maximum(np.abs(yhat), 1))
+        prices[col] = yhat
+        confidence[col] = np.round(conf * 100, 2)
+
+    apply_price_floors_batch(prices)
+
+    return {"price": prices, "confidence_pct": confidence}
+
+
+# --------------------------------------------------------
+# MAIN PREDICT FUNCTION
+# --------------------------------------------------------
+def predict_next_month():
+
+    # Load merged data (just for sanity check or future use)
+    merged = read_dataset("merged").sort_values("month")
+
+    # Load latest exog row + predicted target month
+    next_month, latest_exogs = load_latest_exogs()
+
+    # Build a dataframe for model prediction
+    next_exog_df = pd.DataFrame([latest_exogs])
+
+    # All target models, loaded once per process
+    bundle = get_bundle(MODEL_DIR)
+    yhats = bundle.predict(next_exog_df)
 
-    enforce_floor("90")
-    enforce_floor("92")
-    enforce_floor("95")
-    enforce_floor("98")
+    predictions = score_predictions(bundle, yhats)
+    apply_price_floors(predictions)
 
     # Return both month and predictions in a clean structure
     return next_month, predictions
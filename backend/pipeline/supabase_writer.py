@@ -1,11 +1,8 @@
-import os
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
-load_dotenv()  # ensures local .env works
+from storage import get_storage
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+load_dotenv()  # ensures local .env works
 
 import math
 
@@ -20,19 +17,11 @@ def sanitize(obj):
             return 0.0
     return obj
 
-def get_supabase() -> Client:
-    if not SUPABASE_URL:
-        raise ValueError("SUPABASE_URL environment variable is missing")
-
-    if not SUPABASE_SERVICE_ROLE_KEY:
-        raise ValueError("SUPABASE_SERVICE_ROLE_KEY environment variable is missing")
-
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-
-
 def get_current_month_prices():
     import pandas as pd
-    df = pd.read_csv("data/processed/merged_dataset.csv")
+    from pipeline.data_store import read_dataset
+
+    df = read_dataset("merged")
     df = df.sort_values("month")
 
     latest = df.iloc[-1]
@@ -49,12 +38,9 @@ def get_current_month_prices():
     return result
 
 
-from pipeline.predict import predict_next_month
-from pipeline.supabase_writer import get_current_month_prices
-
-def write_prediction_to_supabase(month: str, predictions: dict):
-
-    supabase = get_supabase()
+def write_prediction(month: str, predictions: dict):
+    """Insert one prediction row through the configured storage backend."""
+    storage = get_storage()
     current_prices = get_current_month_prices()
 
     record = {
@@ -67,6 +53,10 @@ def write_prediction_to_supabase(month: str, predictions: dict):
     # sanitize entire record deeply
     record = sanitize(record)
 
-    res = supabase.table("predictions").insert(record).execute()
+    res = storage.insert_prediction(record)
+
+    print(f"[OK] {storage.name} insert response:", res)
+
 
-    print("[OK] Supabase insert response:", res)
\ No newline at end of file
+# Older name, kept for existing callers
+write_prediction_to_supabase = write_prediction
\ No newline at end of file
@@ -1,18 +1,18 @@
 # pipeline/train_models.py
 
-import pandas as pd
 import numpy as np
 import os
 import json
 import joblib
+from concurrent.futures import ProcessPoolExecutor
 
-from sklearn.model_selection import TimeSeriesSplit
-from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
-from sklearn.metrics import mean_absolute_error
-from xgboost import XGBRegressor
+# sklearn / xgboost are imported where models are built and scored, so
+# importing this module (e.g. for TARGET_COLS or target_groups) is cheap.
+
+from pipeline.data_store import read_dataset
+from pipeline.model_registry import build_bundle
 
 
-MERGED_PATH = "data/processed/merged_dataset.csv"
 MODEL_DIR = "models"
 
 TARGET_COLS = [
@@ -22,8 +22,17 @@ TARGET_COLS = [
     "vivo_90","vivo_92","vivo_95",
 ]
 
+N_SPLITS = 3
+MIN_ROWS = 18
+
+# Shared multi-output models live under models/_multi/
+MULTI_DIR_NAME = "_multi"
+
 
 def build_models():
+    from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+    from xgboost import XGBRegressor
+
     return {
         "rf": RandomForestRegressor(
             n_estimators=500, max_depth=12, random_state=42
@@ -55,23 +64,66 @@ def select_feature_columns(df, target_col):
     return feature_cols
 
 
+# --------------------------------------------------------
+# Building blocks shared by the serial and parallel paths
+# --------------------------------------------------------
+def prepare_target(df, target_col):
+    feature_cols = select_feature_columns(df, target_col)
+    df_train = df.dropna(subset=[target_col]).copy()
+
+    X = df_train[feature_cols]
+    y = df_train[target_col]
+    return feature_cols, X, y
+
+
+def fold_indices(X):
+    from sklearn.model_selection import TimeSeriesSplit
+
+    return list(TimeSeriesSplit(n_splits=N_SPLITS).split(X))
+
+
+def fit_fold(model, X, y, tr_idx, val_idx):
+    from sklearn.metrics import mean_absolute_error
+
+    Xtr, Xv = X.iloc[tr_idx], X.iloc[val_idx]
+    ytr, yv = y.iloc[tr_idx], y.iloc[val_idx]
+
+    model.fit(Xtr, ytr)
+    preds = model.predict(Xv)
+    return mean_absolute_error(yv, preds)
+
+
+def save_model(target_col, model, name, mae, feature_cols):
+    outdir = os.path.join(MODEL_DIR, target_col)
+    os.makedirs(outdir, exist_ok=True)
+
+    joblib.dump(model, os.path.join(outdir, "model.pkl"))
+
+    meta = {
+        "model_name": name,
+        "mae": mae,
+        "features": feature_cols,
+    }
+
+    with open(os.path.join(outdir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"[OK] Saved model + meta → {outdir}")
+
+
 def train_single_target(df, target_col):
 
     print("\n==============================")
     print(f"[INFO] Training model for {target_col}")
     print("==============================")
 
-    feature_cols = select_feature_columns(df, target_col)
-    df_train = df.dropna(subset=[target_col]).copy()
+    feature_cols, X, y = prepare_target(df, target_col)
 
-    X = df_train[feature_cols]
-    y = df_train[target_col]
-
-    if len(df_train) < 18:
+    if len(X) < MIN_ROWS:
         print(f"[WARN] Not enough data for {target_col}")
         return None, None, None
 
-    tscv = TimeSeriesSplit(n_splits=3)
+    folds = fold_indices(X)
 
     best_model = None
     best_name = None
@@ -80,60 +132,279 @@ def train_single_target(df, target_col):
     models = build_models()
 
     for name, model in models.items():
-        maes = []
-
-        for tr_idx, val_idx in tscv.split(X):
-            Xtr, Xv = X.iloc[tr_idx], X.iloc[val_idx]
-            ytr, yv = y.iloc[tr_idx], y.iloc[val_idx]
-
-            model.fit(Xtr, ytr)
-            preds = model.predict(Xv)
-            mae = mean_absolute_error(yv, preds)
-            maes.append(mae)
+        maes = [fit_fold(model, X, y, tr_idx, val_idx) for tr_idx, val_idx in folds]
 
         avg_mae = float(np.mean(maes))
         print(f"[RESULT] {target_col} | {name}: MAE={avg_mae:.2f}")
 
+        # the saved model is the one fitted on the last (largest) fold
         if avg_mae < best_mae:
             best_mae = avg_mae
             best_model = model
             best_name = name
 
     if best_model is not None:
-        outdir = os.path.join(MODEL_DIR, target_col)
-        os.makedirs(outdir, exist_ok=True)
+        save_model(target_col, best_model, best_name, best_mae, feature_cols)
 
-        joblib.dump(best_model, os.path.join(outdir, "model.pkl"))
+    return best_model, best_name, best_mae
 
-        meta = {
-            "model_name": best_name,
-            "mae": best_mae,
-            "features": feature_cols,
-        }
 
-        with open(os.path.join(outdir, "meta.json"), "w") as f:
-            json.dump(meta, f, indent=2)
+# --------------------------------------------------------
+# Process-pool scheduler
+# --------------------------------------------------------
+_WORKER_DF = None
 
-        print(f"[OK] Saved model + meta → {outdir}")
 
-    return best_model, best_name, best_mae
+def _init_worker(df):
+    global _WORKER_DF
+    _WORKER_DF = df
 
+    # One thread per process: the pool already covers every core
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
 
-def train_all_models():
-    print("\n=========== TRAINING MODELS ==========")
 
-    df = pd.read_csv(MERGED_PATH)
-    print(f"[INFO] Loaded merged dataset with {len(df)} rows")
+def _target_task(target_col):
+    _, name, score = train_single_target(_WORKER_DF, target_col)
+    return target_col, name, score
+
+
+def _fold_task(target_col, name, fold):
+    _, X, y = prepare_target(_WORKER_DF, target_col)
+    tr_idx, val_idx = fold_indices(X)[fold]
+    model = build_models()[name]
+    return target_col, name, fold, fit_fold(model, X, y, tr_idx, val_idx)
+
+
+def _refit_task(target_col, name, mae):
+    # Same fit the serial loop keeps: the chosen family on the last fold
+    feature_cols, X, y = prepare_target(_WORKER_DF, target_col)
+    tr_idx, val_idx = fold_indices(X)[-1]
+    model = build_models()[name]
+    fit_fold(model, X, y, tr_idx, val_idx)
+    save_model(target_col, model, name, mae, feature_cols)
+    return target_col
+
 
+def _train_parallel_targets(pool):
     results = {}
+    for target_col, name, score in pool.map(_target_task, TARGET_COLS):
+        results[target_col] = {"model": name, "mae": score}
+    return results
+
+
+def _train_parallel_folds(pool, df):
+    names = list(build_models())
+
+    trainable = []
+    for col in TARGET_COLS:
+        _, X, _ = prepare_target(df, col)
+        if len(X) < MIN_ROWS:
+            print(f"[WARN] Not enough data for {col}")
+        else:
+            trainable.append(col)
+
+    # Stage 1 — every (target, model, fold) fit is independent
+    futures = [
+        pool.submit(_fold_task, col, name, fold)
+        for col in trainable
+        for name in names
+        for fold in range(N_SPLITS)
+    ]
+
+    maes = {}
+    for fut in futures:
+        col, name, fold, mae = fut.result()
+        maes[(col, name, fold)] = mae
+
+    # Pick the best family per target exactly as the serial loop does
+    results = {col: {"model": None, "mae": None} for col in TARGET_COLS}
+    refits = []
+    for col in trainable:
+        best_name, best_mae = None, 1e18
+        for name in names:
+            avg_mae = float(np.mean([maes[(col, name, f)] for f in range(N_SPLITS)]))
+            print(f"[RESULT] {col} | {name}: MAE={avg_mae:.2f}")
+            if avg_mae < best_mae:
+                best_name, best_mae = name, avg_mae
+
+        results[col] = {"model": best_name, "mae": best_mae}
+        refits.append(pool.submit(_refit_task, col, best_name, best_mae))
+
+    # Stage 2 — refit + save the winners
+    for fut in refits:
+        fut.result()
+
+    return results
+
+
+# --------------------------------------------------------
+# Multi-output mode: one shared model per family and target group
+# --------------------------------------------------------
+def target_groups(df):
+    """
+    Group targets whose rows are observed in exactly the same months.
+    Each group can be fitted as one multi-output model without imputing
+    any target; groups keep TARGET_COLS order.
+    """
+    observed = df[TARGET_COLS].notna()
 
+    groups = {}
     for col in TARGET_COLS:
-        model, name, score = train_single_target(df, col)
-        results[col] = {"model": name, "mae": score}
+        groups.setdefault(tuple(observed[col]), []).append(col)
+
+    return [(list(mask), cols) for mask, cols in groups.items()]
+
+
+def _as_2d(preds, n_targets):
+    return np.asarray(preds).reshape(-1, n_targets)
+
+
+def train_multi_output(df):
+    """
+    Train one multi-output model per (target group, family), pick the family
+    with the lowest mean per-target MAE, and save it under
+    models/_multi/group_NN/. Every member target gets a meta.json pointing
+    at the shared model ("shared" dir + "output" column).
+    """
+    from sklearn.metrics import mean_absolute_error
+
+    multi_dir = os.path.join(MODEL_DIR, MULTI_DIR_NAME)
+    results = {col: {"model": None, "mae": None} for col in TARGET_COLS}
+
+    for gi, (mask, targets) in enumerate(target_groups(df)):
+        group = f"group_{gi:02d}"
+        print("\n==============================")
+        print(f"[INFO] Multi-output {group}: {targets}")
+        print("==============================")
+
+        df_train = df.loc[mask]
+        if len(df_train) < MIN_ROWS:
+            print(f"[WARN] Not enough data for {targets}")
+            continue
+
+        feature_cols = select_feature_columns(df, targets[0])
+        X = df_train[feature_cols]
+        # 1-D target for single-member groups (avoids sklearn shape warnings)
+        Y = df_train[targets] if len(targets) > 1 else df_train[targets[0]]
+        Yarr = _as_2d(Y.to_numpy(), len(targets))
+
+        best = None
+        for name, model in build_models().items():
+            fold_maes = []
+            for tr_idx, val_idx in fold_indices(X):
+                model.fit(X.iloc[tr_idx], Y.iloc[tr_idx])
+                P = _as_2d(model.predict(X.iloc[val_idx]), len(targets))
+                fold_maes.append([
+                    mean_absolute_error(Yarr[val_idx, j], P[:, j])
+                    for j in range(len(targets))
+                ])
+
+            per_target = np.mean(fold_maes, axis=0)
+            avg_mae = float(per_target.mean())
+            print(f"[RESULT] {group} | {name}: mean MAE={avg_mae:.2f}")
+
+            if best is None or avg_mae < best[2]:
+                best = (name, model, avg_mae, per_target)
+
+        name, model, _, per_target = best
+
+        outdir = os.path.join(multi_dir, group)
+        os.makedirs(outdir, exist_ok=True)
+        joblib.dump(model, os.path.join(outdir, "model.pkl"))
+
+        with open(os.path.join(outdir, "meta.json"), "w") as f:
+            json.dump({
+                "model_name": name,
+                "targets": targets,
+                "mae": {t: float(m) for t, m in zip(targets, per_target)},
+                "features": feature_cols,
+            }, f, indent=2)
+
+        for j, target in enumerate(targets):
+            tdir = os.path.join(MODEL_DIR, target)
+            os.makedirs(tdir, exist_ok=True)
+            with open(os.path.join(tdir, "meta.json"), "w") as f:
+                json.dump({
+                    "model_name": name,
+                    "mae": float(per_target[j]),
+                    "features": feature_cols,
+                    "shared": os.path.join(MULTI_DIR_NAME, group),
+                    "output": j,
+                }, f, indent=2)
+
+            # a per-target model from an earlier per_target run is stale now
+            stale = os.path.join(tdir, "model.pkl")
+            if os.path.exists(stale):
+                os.remove(stale)
+
+            results[target] = {"model": name, "mae": float(per_target[j])}
+
+        print(f"[OK] Saved shared {name} model → {outdir}")
+
+    return results
+
+
+def train_all_models(workers=None, granularity=None, mode=None):
+    """
+    Train every target, save models/<target>/{model.pkl,meta.json} and
+    rebuild models/bundle.joblib.
+
+    workers      process count (default TRAIN_WORKERS, else all cores);
+                 1 runs the plain serial loop.
+    granularity  "target" — one task per target;
+                 "fold"   — one task per (target, model, fold) fit, then a
+                            refit of each winner (default, finer load balance).
+    mode         "per_target" (default) or "multi_output" (see
+                 train_multi_output); TRAIN_MODE sets the default.
+    Per-target output is byte-identical to the serial run for any
+    workers/granularity.
+    """
+    print("\n=========== TRAINING MODELS ==========")
+
+    df = read_dataset("merged")
+    print(f"[INFO] Loaded merged dataset with {len(df)} rows")
+
+    mode = mode or os.getenv("TRAIN_MODE", "per_target")
+    if mode == "multi_output":
+        results = train_multi_output(df)
+        build_bundle(MODEL_DIR)
+        print("\n[OK] All models trained (multi-output).")
+        return results
+    if mode != "per_target":
+        raise ValueError(f"Unknown training mode: {mode}")
+
+    if workers is None:
+        workers = int(os.getenv("TRAIN_WORKERS", "0")) or os.cpu_count() or 1
+    granularity = granularity or os.getenv("TRAIN_GRANULARITY", "fold")
+
+    if granularity not in ("target", "fold"):
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    if workers <= 1:
+        results = {}
+
+        for col in TARGET_COLS:
+            model, name, score = train_single_target(df, col)
+            results[col] = {"model": name, "mae": score}
+
+    else:
+        print(f"[INFO] Parallel training: {workers} workers, per-{granularity} tasks")
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(df,)
+        ) as pool:
+            if granularity == "target":
+                results = _train_parallel_targets(pool)
+            else:
+                results = _train_parallel_folds(pool, df)
+
+    # Pack the selected models for serving (pipeline/model_registry.py)
+    build_bundle(MODEL_DIR)
 
     print("\n[OK] All models trained.")
     return results
 
 
 if __name__ == "__main__":
-    train_all_models()
\ No newline at end of file
+    train_all_models()
@@ -0,0 +1,228 @@
+# pipeline/tree_compiler.py
+#
+# Flatten fitted tree ensembles (RandomForest / ExtraTrees / XGBoost) into
+# packed NumPy node arrays and evaluate them with pure NumPy.
+#
+# All trees of a model share one set of arrays; every row walks every tree
+# in lock-step, one depth level per iteration, so a batch costs
+# max_depth vectorized steps instead of n_trees Python-level calls.
+
+import json
+
+import numpy as np
+
+LEAF = -1
+
+
+class CompiledEnsemble:
+    """
+    feature    int32   [n_nodes]           split feature (0 for leaves)
+    threshold  float64 [n_nodes]           split value
+    left/right int32   [n_nodes]           global child index, -1 at leaves
+    missing_left bool  [n_nodes]           direction for NaN inputs
+    value      float64 [n_nodes, n_out]    leaf contribution
+    roots      int32   [n_trees]           root node of each tree
+
+    strict     False: go left when x <= threshold (sklearn)
+               True:  go left when x <  threshold (XGBoost)
+    scale/base prediction = sum(leaf values) * scale + base
+    """
+
+    ARRAYS = ["feature", "threshold", "left", "right", "missing_left", "value", "roots", "base"]
+
+    def __init__(self, feature, threshold, left, right, missing_left, value,
+                 roots, base, scale, strict, max_depth, kind):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.base = base
+        self.scale = scale
+        self.strict = strict
+        self.max_depth = max_depth
+        self.kind = kind
+
+    @property
+    def n_outputs(self):
+        return self.value.shape[1]
+
+    def predict(self, X):
+        """
+        X: (n_rows, n_features) → (n_rows,) or (n_rows, n_outputs).
+        Finite values must fit in float32 (see model_registry.FLOAT32_MAX).
+        """
+        # Both sklearn and XGBoost compare float32 inputs
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n = X.shape[0]
+        rows = np.arange(n)[:, None]
+
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            internal = left != LEAF
+            if not internal.any():
+                break
+
+            x = X[rows, self.feature[node]]
+            thr = self.threshold[node]
+            go_left = (x < thr) if self.strict else (x <= thr)
+            go_left = np.where(np.isnan(x), self.missing_left[node], go_left)
+
+            node = np.where(internal, np.where(go_left, left, self.right[node]), node)
+
+        out = self.value[node].sum(axis=1) * self.scale + self.base
+        return out[:, 0] if out.shape[1] == 1 else out
+
+    # ----- persistence -----
+    def save(self, path):
+        meta = {
+            "scale": self.scale,
+            "strict": self.strict,
+            "max_depth": self.max_depth,
+            "kind": self.kind,
+        }
+        np.savez(path, meta=json.dumps(meta), **{k: getattr(self, k) for k in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        data = np.load(path, mmap_mode="r" if mmap else None)
+        meta = json.loads(str(data["meta"]))
+        return cls(**{k: data[k] for k in cls.ARRAYS}, **meta)
+
+
+# --------------------------------------------------------
+# Packing helpers
+# --------------------------------------------------------
+def _depth(left, right, root=0):
+    depth, stack = 0, [(root, 0)]
+    while stack:
+        i, d = stack.pop()
+        depth = max(depth, d)
+        if left[i] != LEAF:
+            stack.append((left[i], d + 1))
+            stack.append((right[i], d + 1))
+    return depth
+
+
+def _pack(trees, n_outputs, base, scale, strict, kind):
+    """trees: list of dicts with per-tree local arrays; children are local ids."""
+    offsets = np.cumsum([0] + [len(t["feature"]) for t in trees])
+
+    def cat(key, dtype):
+        return np.concatenate([np.asarray(t[key], dtype=dtype) for t in trees])
+
+    left = cat("left", np.int64)
+    right = cat("right", np.int64)
+    for t, off in zip(trees, offsets[:-1]):
+        n = len(t["feature"])
+        sl = slice(off, off + n)
+        left[sl] = np.where(left[sl] == LEAF, LEAF, left[sl] + off)
+        right[sl] = np.where(right[sl] == LEAF, LEAF, right[sl] + off)
+
+    value = np.concatenate([np.asarray(t["value"], dtype=np.float64).reshape(-1, n_outputs)
+                            for t in trees])
+
+    return CompiledEnsemble(
+        feature=np.where(left == LEAF, 0, cat("feature", np.int64)).astype(np.int32),
+        threshold=cat("threshold", np.float64),
+        left=left.astype(np.int32),
+        right=right.astype(np.int32),
+        missing_left=cat("missing_left", bool),
+        value=value,
+        roots=offsets[:-1].astype(np.int32),
+        base=np.asarray(base, dtype=np.float64).reshape(n_outputs),
+        scale=float(scale),
+        strict=strict,
+        max_depth=max(_depth(t["left"], t["right"]) for t in trees),
+        kind=kind,
+    )
+
+
+# --------------------------------------------------------
+# Exporters
+# --------------------------------------------------------
+def _compile_sklearn_forest(model):
+    trees = []
+    n_outputs = model.n_outputs_
+
+    for est in model.estimators_:
+        t = est.tree_
+        missing = getattr(t, "missing_go_to_left", None)
+        trees.append({
+            "feature": t.feature,
+            "threshold": t.threshold,
+            "left": t.children_left,
+            "right": t.children_right,
+            "missing_left": missing if missing is not None else np.zeros(t.node_count, bool),
+            "value": t.value[:, :, 0],
+        })
+
+    return _pack(trees, n_outputs, np.zeros(n_outputs), 1.0 / len(trees), False, "forest")
+
+
+def _compile_xgboost(model):
+    raw = json.loads(model.get_booster().save_raw(raw_format="json"))
+    learner = raw["learner"]
+
+    if learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError(f"Unsupported XGBoost objective: {learner['objective']['name']}")
+
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise ValueError(f"Unsupported XGBoost booster: {gbm['name']}")
+
+    base = [float(v) for v in learner["learner_model_param"]["base_score"].strip("[]").split(",")]
+    n_outputs = max(int(learner["learner_model_param"].get("num_target", "1")), 1)
+    if len(base) == 1:
+        base = base * n_outputs
+
+    trees = []
+    for tree, output in zip(gbm["model"]["trees"], gbm["model"]["tree_info"]):
+        if int(tree["tree_param"].get("size_leaf_vector", "1")) > 1:
+            raise ValueError("Vector-leaf XGBoost trees are not supported")
+
+        left = np.asarray(tree["left_children"])
+        leaf = left == LEAF
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+
+        # a leaf's split_condition holds its (already shrunk) weight
+        value = np.zeros((len(left), n_outputs))
+        value[leaf, output] = cond[leaf]
+
+        trees.append({
+            "feature": tree["split_indices"],
+            "threshold": np.where(leaf, 0.0, cond),
+            "left": left,
+            "right": tree["right_children"],
+            "missing_left": np.asarray(tree["default_left"], dtype=bool),
+            "value": value,
+        })
+
+    return _pack(trees, n_outputs, base, 1.0, True, "xgboost")
+
+
+def compile_model(model):
+    """Fitted RF / ExtraTrees / XGBRegressor → CompiledEnsemble."""
+    name = type(model).__name__
+
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        return _compile_sklearn_forest(model)
+    if name == "XGBRegressor":
+        return _compile_xgboost(model)
+
+    raise TypeError(f"Cannot compile model of type {name}")
+
+
+def check_parity(model, compiled, X, rtol=1e-5):
+    """Max relative deviation between compiled and native predict; raises if > rtol."""
+    native = np.asarray(model.predict(X), dtype=np.float64)
+    ours = compiled.predict(X).reshape(native.shape)
+
+    err = np.max(np.abs(ours - native) / np.maximum(np.abs(native), 1.0))
+    if err > rtol:
+        raise AssertionError(f"Compiled model deviates from native predict: {err:.3g} > {rtol}")
+    return float(err)
@@ -1,31 +1,20 @@
 import pandas as pd
 import os
-from isibens_html_to_csv import isibens_html_to_csv
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline.data_store import TARGET_COLS
+from pipeline.history_store import MonthStore, monthly_row
+from pipeline.isibens_html_to_csv import parse_isibens_table
 
 RAW_DIR = "data/isibens"
-HIST_PATH = "data/processed/fuel_price_indonesia_clean.csv"
-
-COLUMN_MAP = {
-    "90": {"pertamina": "pertamina_90", "vivo": "vivo_90"},
-    "92": {"pertamina": "pertamina_92", "vivo": "vivo_92", "bp": "bp_92", "shell": "shell_92"},
-    "95": {"pertamina": "pertamina_95", "vivo": "vivo_95", "bp": "bp_95", "shell": "shell_95"},
-    "98": {"pertamina": "pertamina_98", "shell": "shell_98"},
-}
-
-def clean_val(v):
-    """Convert invalid numbers (0, NaN, '-', empty) to None."""
-    if pd.isna(v):
-        return None
-    s = str(v).strip()
-    if s == "" or s == "-" or s == "0":
-        return None
-    try:
-        num = float(s)
-        if num == 0:
-            return None
-        return num
-    except:
-        return None
+
+# Backfill: which snapshot of a month becomes its row, and how many
+# processes parse snapshots
+REDUCERS = ("first", "last", "median")
+BACKFILL_REDUCE = os.getenv("BACKFILL_REDUCE", "last")
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "0")) or os.cpu_count() or 1
 
 
 def extract_date_from_filename(path):
@@ -43,76 +32,187 @@ def extract_date_from_filename(path):
     return date
 
 
-def update_historical(raw_html_path):
+def update_historical(raw_html_path, store=None):
     print("\n================= UPDATE START =================")
 
-    clean_csv_path = os.path.join(RAW_DIR, "isibens_clean.csv")
-
     # STEP 1 — PARSE DATE
     date = extract_date_from_filename(raw_html_path)
     month = date[:7]
     print(f"[INFO] Parsed date: {date} → month: {month}")
 
-    # STEP 2 — CONVERT HTML-WRAPPED CSV → CLEAN CSV
-    print("[INFO] Converting HTML wrapper → clean CSV…")
-    isibens_html_to_csv(raw_html_path, clean_csv_path)
-
-    # STEP 3 — LOAD CLEAN CSV
-    print("[INFO] Loading cleaned CSV…")
-    df_clean = pd.read_csv(clean_csv_path)
-    print("\n[DEBUG] Clean CSV Loaded:")
-    print(df_clean)
-
-    # STEP 4 — LOAD HISTORICAL
-    print("\n[INFO] Loading historical dataset…")
-    df_hist = pd.read_csv(HIST_PATH)
-    print(f"[DEBUG] Historical rows before update: {len(df_hist)}")
-
-    df_hist["month"] = df_hist["date"].str[:7]
-    print(f"[DEBUG] Existing months in historical:")
-    print(sorted(df_hist['month'].unique()))
-
-    # STEP 5 — CHECK IF MONTH ALREADY EXISTS
-    if month in df_hist["month"].values:
+    # STEP 2 — CHECK IF MONTH ALREADY EXISTS (month index, no history load)
+    store = store or MonthStore()
+    if store.has_month(month):
         print(f"\n[SKIP] Month {month} already exists — NOT updating.\n")
         print("================== UPDATE END ==================\n")
         return False
 
     print(f"\n[INFO] Month {month} not found — APPENDING new row.")
 
-    # STEP 6 — BUILD NEW ROW
-    new_row = {col: None for col in df_hist.columns if col != "month"}
-    new_row["date"] = date
-
-    for _, r in df_clean.iterrows():
-        ron = str(int(float(r["ron"])))
-        print(f"[DEBUG] Row for RON {ron}")
-
-        if ron not in COLUMN_MAP:
-            print(f"[WARN] Unsupported RON {ron}")
-            continue
-
-        for provider_src, col_hist in COLUMN_MAP[ron].items():
-            value = clean_val(r.get(provider_src))
-            print(f"   • {provider_src} → {col_hist} = {value}")
-            new_row[col_hist] = value
+    # STEP 3 — PARSE THE HTML-WRAPPED TABLE (straight to a frame, no clean CSV)
+    print("[INFO] Parsing HTML wrapper…")
+    df_clean = parse_isibens_table(raw_html_path)
+    print("\n[DEBUG] Clean table:")
+    print(df_clean)
 
+    # STEP 4 — BUILD NEW ROW
+    new_row = monthly_row(df_clean, date)
     print("\n[INFO] Final row to append:")
-    print(new_row)
+    print(new_row.to_dict("records")[0])
 
-    # STEP 7 — APPEND ROW
-    df_hist = df_hist.drop(columns=["month"])
-    df_hist.loc[len(df_hist)] = new_row
-    df_hist.to_csv(HIST_PATH, index=False)
+    # STEP 5 — APPEND ROW (one segment + index; the history is never rewritten)
+    store.append(month, new_row)
 
     print("\n[OK] Historical dataset updated successfully.")
-    print(f"[DEBUG] Historical rows after update: {len(df_hist)}")
+    print(f"[DEBUG] Historical months after update: {len(store.months())}")
     print("================== UPDATE END ==================\n")
 
     return True
 
 
+# --------------------------------------------------------
+# Bulk backfill from a directory of dated snapshots
+# --------------------------------------------------------
+def snapshot_files(raw_dir):
+    """RAW isibens_*.csv snapshots with a YYYYMMDD date in the filename, oldest first."""
+    files = [
+        f for f in os.listdir(raw_dir)
+        if f.startswith("isibens_") and f.endswith(".csv") and f != "isibens_clean.csv"
+        and re.search(r"\d{8}", f)
+    ]
+    return sorted((os.path.join(raw_dir, f) for f in files), key=snapshot_date)
+
+
+def snapshot_date(path):
+    digits = re.search(r"\d{8}", os.path.basename(path)).group(0)
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}"
+
+
+def select_snapshots(paths, how, stored):
+    """
+    {month: snapshots in the order they are tried}, for the months the
+    history does not have yet. first / last try the month's earliest /
+    latest snapshot (known from the filename) and only move on to the
+    next one if it cannot be parsed; median needs all of them.
+    """
+    by_month = {}
+    for path in paths:
+        month = snapshot_date(path)[:7]
+        if month not in stored:
+            by_month.setdefault(month, []).append(path)
+
+    if how == "last":
+        return {month: group[::-1] for month, group in by_month.items()}
+    return by_month
+
+
+def parse_snapshot(path):
+    """One snapshot → one-row fuel frame dated from its filename."""
+    return monthly_row(parse_isibens_table(path), snapshot_date(path))
+
+
+def _parse_snapshot_safe(path):
+    # worker task: report failures instead of aborting the whole pool
+    try:
+        return path, parse_snapshot(path)
+    except Exception as e:
+        return path, e
+
+
+def _parse_snapshots(paths, workers):
+    if workers > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_parse_snapshot_safe, paths, chunksize=chunksize))
+    return [_parse_snapshot_safe(path) for path in paths]
+
+
+def reduce_months(rows, how="last"):
+    """
+    One row per month from many snapshot rows:
+      first / last  the month's earliest / latest snapshot
+      median        per-column median over the month's snapshots, dated
+                    by its latest snapshot
+    """
+    rows = rows.sort_values("date", kind="stable")
+    if how in ("first", "last"):
+        out = rows.drop_duplicates(subset=["month"], keep=how)
+    else:
+        grouped = rows.groupby("month", sort=True)
+        out = grouped[TARGET_COLS].median()
+        out["date"] = grouped["date"].max()
+        out = out.reset_index()
+
+    return out.sort_values("month").reset_index(drop=True)
+
+
+def backfill(raw_dir, how=None, workers=None, store=None):
+    """
+    Parse the dated snapshots in `raw_dir` in a process pool, reduce them
+    to one row per month and add the months the history does not have yet
+    in a single write. Returns the months added.
+    """
+    how = how or BACKFILL_REDUCE
+    if how not in REDUCERS:
+        raise ValueError(f"Unknown reducer '{how}', expected one of {REDUCERS}")
+    workers = workers or BACKFILL_WORKERS
+    store = store or MonthStore()
+
+    print("\n================= BACKFILL START =================")
+    paths = snapshot_files(raw_dir)
+    candidates = select_snapshots(paths, how, set(store.months()))
+    single = how in ("first", "last")
+    n_parse = len(candidates) if single else sum(map(len, candidates.values()))
+    print(f"[INFO] {len(paths)} snapshot(s) in {raw_dir}, {n_parse} to parse "
+          f"— reducer: {how}, workers: {workers}")
+    if not candidates:
+        print("[OK] Nothing to backfill")
+        print("================== BACKFILL END ==================\n")
+        return []
+
+    # first / last: one snapshot per month; a month whose snapshot fails
+    # is retried with its next candidate instead of being dropped
+    frames = []
+    parsed = set()
+    pending = candidates
+    while pending:
+        selected = [p for group in pending.values() for p in (group[:1] if single else group)]
+
+        for path, result in _parse_snapshots(selected, workers):
+            if isinstance(result, Exception):
+                print(f"[WARN] Skipping {os.path.basename(path)}: {result}")
+            else:
+                frames.append(result)
+                parsed.add(snapshot_date(path)[:7])
+
+        if not single:
+            break
+        pending = {m: g[1:] for m, g in pending.items() if m not in parsed and len(g) > 1}
+        if pending:
+            print(f"[INFO] Retrying {len(pending)} month(s) with their next snapshot")
+
+    missing = sorted(set(candidates) - parsed)
+    if missing:
+        print(f"[WARN] No parsable snapshot for {len(missing)} month(s): {', '.join(missing)}")
+
+    if not frames:
+        print("[ERROR] No snapshot could be parsed")
+        return []
+
+    monthly = reduce_months(pd.concat(frames, ignore_index=True), how)
+    added = store.extend(monthly)
+
+    print(f"[OK] Backfilled {len(added)} month(s) → {store.base_path}")
+    print("================== BACKFILL END ==================\n")
+    return added
+
+
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "backfill":
+        # python -m pipeline.update_historical backfill <dir> [first|last|median]
+        backfill(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        sys.exit(0)
+
     # Find RAW HTML-wrapped CSVs with a date inside filename
     files = [
         f for f in os.listdir(RAW_DIR)
@@ -1,7 +1,7 @@
 import os
 import json
 from datetime import datetime
-from util_supabase import supabase
+from storage import get_storage
 
 # import your existing modules
 from fetch_and_update import update_historical
@@ -13,16 +13,16 @@ from predict import predict_next_month
 DATA_ISIBENS_PATH = "data/isibens"
 
 def store_prediction(pred, conf):
-    """Write the prediction + confidence to Supabase."""
+    """Write the prediction + confidence to the configured storage."""
     next_month = (datetime.now().replace(day=1) + 
                   datetime.timedelta(days=35)).strftime("%Y-%m")
 
-    supabase.table("predictions").insert({
+    get_storage().insert_prediction({
         "month": next_month,
         "model": pred,
         "confidence": conf,
         "html_snippet": json.dumps(pred)
-    }).execute()
+    })
 
 def run_pipeline():
     print("=== RUNNING DAILY PIPELINE ===")
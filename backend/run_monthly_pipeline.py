@@ -1,17 +1,24 @@
 import os
+import sys
 from dotenv import load_dotenv
 load_dotenv()
 from pipeline.fetch_and_update import update_historical
 from pipeline.exog_loader import update_exog_history
-from pipeline.merge_dataset import merge_monthly_dataset
+from pipeline.merge_dataset import file_digest, merge_monthly_dataset
+from pipeline.data_store import dataset_path
 from pipeline.train_models import train_all_models
 from pipeline.predict import predict_next_month
-from pipeline.fetch_isibens import fetch_isibens_file
-from pipeline.supabase_writer import write_prediction_to_supabase
+from pipeline.fetch_isibens import fetch_isibens_snapshot, mark_processed
+from pipeline.supabase_writer import write_prediction
 import traceback
 
 
-def run_pipeline():
+def merged_digest():
+    path = dataset_path("merged")
+    return file_digest(path) if os.path.exists(path) else None
+
+
+def run_pipeline(force=False):
 
     print("\n==============================================")
     print("        FUEL PRICE PREDICTION PIPELINE")
@@ -23,8 +30,17 @@ def run_pipeline():
         # ------------------------------------------------------
         print("\n[ STEP 1 ] Downloading latest fuel price file…")
 
-        csv_path = fetch_isibens_file()  # must return path of downloaded CSV
-        print(f"[OK] Downloaded: {csv_path}")
+        fetched = fetch_isibens_snapshot()
+        csv_path = fetched["path"]
+        print(f"[OK] Downloaded: {csv_path} ({fetched['status']})")
+
+        # Same payload as the last completed run: the fuel history only
+        # changes if its month is missing (checked without re-parsing),
+        # and training only re-runs if the merged dataset changes
+        unchanged = fetched["processed"] and not force
+        if unchanged:
+            print(f"[INFO] Fuel price page unchanged since the last completed run "
+                  f"({fetched['sha256'][:12]})")
 
         # ------------------------------------------------------
         # STEP 2 – Update historical fuel database
@@ -42,13 +58,18 @@ def run_pipeline():
         # STEP 4 – Merge datasets
         # ------------------------------------------------------
         print("\n[ STEP 4 ] Merging master dataset…")
+        before = merged_digest()
         merge_monthly_dataset()
+        merged_changed = merged_digest() != before
 
         # --------------------------------------------------------
         # STEP 5: TRAIN MODELS
         # --------------------------------------------------------
-        print("\n[ STEP 5 ] Training models…")
-        train_all_models()
+        if unchanged and not merged_changed:
+            print("\n[ STEP 5 ] Skipped — merged dataset unchanged (--force to retrain)")
+        else:
+            print("\n[ STEP 5 ] Training models…")
+            train_all_models()
 
         # --------------------------------------------------------
         # STEP 6: PREDICT NEXT MONTH
@@ -57,8 +78,8 @@ def run_pipeline():
 
         month, results = predict_next_month()
 
-        # Save results to Supabase
-        write_prediction_to_supabase(month, results)
+        # Save results (Supabase or local SQLite, see STORAGE_BACKEND)
+        write_prediction(month, results)
 
         print("\n===== FINAL PREDICTION OUTPUT =====")
         for brand_ron, obj in results.items():
@@ -68,6 +89,9 @@ def run_pipeline():
 
         print("====================================")
 
+        mark_processed(fetched["sha256"])
+        return True
+
     except Exception as e:
         print("\n[ERROR] Pipeline failed:")
         print(str(e))
@@ -75,4 +99,4 @@ def run_pipeline():
 
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    run_pipeline(force="--force" in sys.argv or os.getenv("PIPELINE_FORCE") == "1")
\ No newline at end of file
@@ -0,0 +1,28 @@
+-- Atomic visit counter used by storage/supabase_store.py (SupabaseStorage).
+--
+-- One call per flush window: every element of `batch` is
+-- {"ip_hash": ..., "fp": ..., "user_agent": ..., "count": n}
+-- and is inserted or added onto the existing row in a single statement,
+-- so concurrent flushes (several workers/instances) never lose increments.
+-- ip_hash must be unique within a batch (VisitBatcher aggregates per hash).
+
+create unique index if not exists visits_ip_hash_key on public.visits (ip_hash);
+
+create or replace function public.track_visits(batch jsonb)
+returns void
+language sql
+as $$
+  insert into public.visits as v (ip_hash, fp, user_agent, visits, last_seen)
+  select
+    b->>'ip_hash',
+    b->>'fp',
+    b->>'user_agent',
+    coalesce((b->>'count')::int, 1),
+    now()
+  from jsonb_array_elements(batch) as b
+  on conflict (ip_hash) do update set
+    visits     = v.visits + excluded.visits,
+    fp         = coalesce(excluded.fp, v.fp),
+    user_agent = coalesce(excluded.user_agent, v.user_agent),
+    last_seen  = now();
+$$;
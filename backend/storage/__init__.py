@@ -0,0 +1,40 @@
+import os
+
+from storage.sqlite_store import SQLiteStorage
+from storage.supabase_store import SupabaseStorage
+
+DEFAULT_SQLITE_PATH = "data/local/fuel.db"
+
+_storage = None
+
+
+def make_storage(backend=None):
+    """
+    Build a backend from STORAGE_BACKEND: "supabase" (default) or "sqlite"
+    for a single box with no network (file at STORAGE_SQLITE_PATH).
+    Read at call time so a .env loaded after import still applies.
+    """
+    backend = backend or os.getenv("STORAGE_BACKEND", "supabase")
+
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("STORAGE_SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    if backend == "supabase":
+        return SupabaseStorage()
+
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def get_storage():
+    """Process-wide storage instance, created on first use."""
+    global _storage
+    if _storage is None:
+        _storage = make_storage()
+    return _storage
+
+
+__all__ = [
+    "SQLiteStorage",
+    "SupabaseStorage",
+    "get_storage",
+    "make_storage",
+]
@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+
+
+class Storage(ABC):
+    """
+    Storage interface shared by the API and the pipeline.
+
+    Two record families:
+      • predictions — one row per pipeline run (month, model, confidence, …)
+      • visits      — per-visitor counters keyed on ip_hash
+
+    Implementations: SupabaseStorage (production) and SQLiteStorage
+    (single box, no network). Pick one with STORAGE_BACKEND.
+    """
+
+    name = "base"
+
+    # ----- predictions -----
+    @abstractmethod
+    def insert_prediction(self, record):
+        """Store one prediction row."""
+
+    @abstractmethod
+    def latest_prediction(self):
+        """The most recent prediction row, or None."""
+
+    # ----- visits -----
+    @abstractmethod
+    def increment_visits(self, batch):
+        """
+        Atomic increment-or-insert for a batch of
+        {"ip_hash", "fp", "user_agent", "count"} dicts (one per ip_hash).
+        """
+
+    @abstractmethod
+    def visit_count(self, ip_hash):
+        """Visits recorded for one ip_hash (0 if unseen)."""
+
+    @abstractmethod
+    def visitor_total(self):
+        """Number of distinct visitors."""
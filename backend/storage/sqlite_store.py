@@ -0,0 +1,130 @@
+import os
+import json
+import sqlite3
+import threading
+
+from storage.base import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id              INTEGER PRIMARY KEY,
+    created_at      TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    month           TEXT,
+    model           TEXT,
+    confidence      TEXT,
+    current_prices  TEXT,
+    html_snippet    TEXT
+);
+
+CREATE TABLE IF NOT EXISTS visits (
+    id          INTEGER PRIMARY KEY,
+    ip_hash     TEXT NOT NULL UNIQUE,
+    fp          TEXT,
+    user_agent  TEXT,
+    visits      INTEGER NOT NULL DEFAULT 0,
+    first_seen  TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_seen   TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Same semantics as the track_visits Postgres function
+VISIT_UPSERT = """
+INSERT INTO visits (ip_hash, fp, user_agent, visits, last_seen)
+VALUES (:ip_hash, :fp, :user_agent, :count, CURRENT_TIMESTAMP)
+ON CONFLICT (ip_hash) DO UPDATE SET
+    visits     = visits.visits + excluded.visits,
+    fp         = COALESCE(excluded.fp, visits.fp),
+    user_agent = COALESCE(excluded.user_agent, visits.user_agent),
+    last_seen  = CURRENT_TIMESTAMP
+"""
+
+# JSON-typed columns of the predictions table
+PREDICTION_JSON = ["model", "confidence", "current_prices"]
+
+
+class SQLiteStorage(Storage):
+    """
+    Embedded backend on one SQLite file (WAL mode). One connection per
+    thread; every write is a single transaction.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ----- predictions -----
+    def insert_prediction(self, record):
+        row = dict(record)
+        for k in PREDICTION_JSON:
+            if k in row:
+                row[k] = json.dumps(row[k])
+
+        cols = ", ".join(row)
+        marks = ", ".join("?" for _ in row)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                f"INSERT INTO predictions ({cols}) VALUES ({marks})", list(row.values())
+            )
+        return cur.lastrowid
+
+    def latest_prediction(self):
+        row = self._conn().execute(
+            "SELECT * FROM predictions ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+
+        out = dict(row)
+        for k in PREDICTION_JSON:
+            if out.get(k) is not None:
+                out[k] = json.loads(out[k])
+        return out
+
+    # ----- visits -----
+    def increment_visits(self, batch):
+        if not batch:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                VISIT_UPSERT,
+                [
+                    {
+                        "ip_hash": hit["ip_hash"],
+                        "fp": hit.get("fp"),
+                        "user_agent": hit.get("user_agent"),
+                        "count": hit.get("count", 1),
+                    }
+                    for hit in batch
+                ],
+            )
+
+    def visit_count(self, ip_hash):
+        row = self._conn().execute(
+            "SELECT visits FROM visits WHERE ip_hash = ?", (ip_hash,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def visitor_total(self):
+        return self._conn().execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+
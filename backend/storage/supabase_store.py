@@ -0,0 +1,66 @@
+from storage.base import Storage
+from util_supabase import get_supabase
+
+
+def _visit_payload(batch):
+    return [
+        {
+            "ip_hash": hit["ip_hash"],
+            "fp": hit.get("fp"),
+            "user_agent": hit.get("user_agent"),
+            "count": hit.get("count", 1),
+        }
+        for hit in batch
+    ]
+
+
+class SupabaseStorage(Storage):
+    """
+    Supabase/PostgREST backend. Visit counting goes through the
+    `track_visits` function (sql/track_visits.sql).
+    """
+
+    name = "supabase"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        # Shared, lazily-created pooled client unless one was injected
+        if self._client is not None:
+            return self._client
+        return get_supabase()
+
+    # ----- predictions -----
+    def insert_prediction(self, record):
+        return self.client.table("predictions").insert(record).execute()
+
+    def latest_prediction(self):
+        res = self.client.table("predictions") \
+            .select("*") \
+            .order("id", desc=True) \
+            .limit(1) \
+            .execute()
+        return res.data[0] if res and res.data else None
+
+    # ----- visits -----
+    def increment_visits(self, batch):
+        if not batch:
+            return
+        self.client.rpc("track_visits", {"batch": _visit_payload(batch)}).execute()
+
+    def visit_count(self, ip_hash):
+        res = self.client.table("visits") \
+            .select("visits") \
+            .eq("ip_hash", ip_hash) \
+            .maybe_single() \
+            .execute()
+        return res.data["visits"] if res and res.data else 0
+
+    def visitor_total(self):
+        res = self.client.table("visits") \
+            .select("id", count="exact", head=True) \
+            .execute()
+        return res.count or 0
+
@@ -1,7 +1,74 @@
 import os
-from supabase import create_client
+import threading
 
-SUPABASE_URL = os.getenv("https://ogtqwxjoztohigpknjro.supabase.co")
-SUPABASE_KEY = os.getenv("sb_secret_63jrFib062H-6pFrJ4aYwQ_FMb5snwz")
+from dotenv import load_dotenv
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+load_dotenv()
+
+# One pooled HTTP session shared by every PostgREST/RPC call in the process;
+# keep-alive means each write reuses an open TLS connection.
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = 60.0
+TIMEOUT = 30.0
+
+_client = None
+_http = None
+_lock = threading.Lock()
+
+
+def get_supabase():
+    """
+    Process-wide Supabase client, created on first use.
+    Safe to call from request handlers and worker threads.
+    """
+    global _client, _http
+
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is not None:
+            return _client
+
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url:
+            raise ValueError("SUPABASE_URL environment variable is missing")
+        if not key:
+            raise ValueError("SUPABASE_SERVICE_ROLE_KEY environment variable is missing")
+
+        import httpx
+        from supabase import ClientOptions, create_client
+
+        _http = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=TIMEOUT,
+        )
+        _client = create_client(url, key, options=ClientOptions(httpx_client=_http))
+        print("[INFO] Supabase client initialised (pooled HTTP session)")
+
+    return _client
+
+
+def warm_supabase():
+    """Build the client ahead of the first request; errors are only logged."""
+    try:
+        get_supabase()
+    except Exception as e:
+        print(f"[WARN] Supabase warm-up failed: {e}")
+
+
+def close_supabase():
+    """Close the shared HTTP session (FastAPI shutdown / end of pipeline)."""
+    global _client, _http
+
+    with _lock:
+        if _http is not None:
+            _http.close()
+        _client = None
+        _http = None